@@ -1,13 +1,18 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import ORDER_VAR, PAGE_VAR
 from django.contrib.auth.admin import UserAdmin
 from django.utils.translation import gettext_lazy as _
+from authentication.managers import phone_search_q
 from authentication.models import UserModel
+from authentication.paginators import KeysetPaginator, decode_cursor
+
+CURSOR_VAR = 'cursor'
 
 
 @admin.register(UserModel)
 class CustomUserAdmin(UserAdmin):
     model = UserModel
-    ordering = ['-created_at']
+    ordering = ['-created_at', '-id']
     list_display = [
         'id', 'phone_number', 'country', 'is_verified',
         'is_staff', 'is_active', 'created_at'
@@ -16,8 +21,13 @@ class CustomUserAdmin(UserAdmin):
         'is_staff', 'is_superuser', 'is_active',
         'is_verified', 'country', 'created_at'
     ]
-    search_fields = ['phone_number', 'country']
+    # Partial phone numbers are routed to the digit indexes in
+    # get_search_results(), other terms search the country.
+    search_fields = ['country']
+    search_help_text = _('Search by the first or last digits of a phone number, or by country.')
     list_per_page = 25
+    paginator = KeysetPaginator
+    show_full_result_count = False
 
     fieldsets = (
         (None, {'fields': ('phone_number', 'password')}),
@@ -48,3 +58,39 @@ class CustomUserAdmin(UserAdmin):
 
     def get_queryset(self, request):
         return super().get_queryset(request).select_related()
+
+    def get_search_results(self, request, queryset, search_term):
+        q = phone_search_q(search_term)
+        if q is None:
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(q), False
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        return self.paginator(
+            queryset, per_page, orphans, allow_empty_first_page,
+            cursor=getattr(request, '_changelist_cursor', None),
+        )
+
+    def changelist_view(self, request, extra_context=None):
+        # The cursor only makes sense in the default ordering; ChangeList
+        # rejects parameters it doesn't know, so take it out of the query.
+        keyset = ORDER_VAR not in request.GET and PAGE_VAR not in request.GET
+        if CURSOR_VAR in request.GET:
+            request.GET = request.GET.copy()
+            cursor = decode_cursor(request.GET.pop(CURSOR_VAR)[0])
+            if keyset:
+                request._changelist_cursor = cursor
+
+        response = super().changelist_view(request, extra_context)
+        cl = (getattr(response, 'context_data', None) or {}).get('cl')
+        if cl is None or not keyset or not cl.multi_page or cl.show_all:
+            return response
+
+        next_cursor = cl.paginator.next_cursor(cl.result_list)
+        response.context_data.update({
+            'keyset_pagination': True,
+            'result_count_estimated': cl.paginator.estimated,
+            'first_page_url': cl.get_query_string() if cl.paginator.cursor else None,
+            'next_page_url': cl.get_query_string({CURSOR_VAR: next_cursor}) if next_cursor else None,
+        })
+        return response
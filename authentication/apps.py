@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class AuthenticationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'authentication'
+
+    def ready(self):
+        from django.contrib.auth.signals import user_logged_in
+
+        from authentication import checks, signals  # noqa: F401
+
+        user_logged_in.disconnect(dispatch_uid='update_last_login')
+        user_logged_in.connect(signals.buffer_last_login, dispatch_uid='buffer_last_login')
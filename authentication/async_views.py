@@ -0,0 +1,184 @@
+"""
+Async-native versions of the register, login and logout endpoints.
+
+They use the async ORM for every query and run password hashing on the
+bounded hashing executor, so under ASGI a worker never parks a thread on
+PBKDF2 or on a blacklist write.
+"""
+import math
+
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.db import IntegrityError
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from authentication.conf import app_settings
+from authentication.hashing import acheck_password, amake_password
+from authentication.metrics import timed
+from authentication.models import UserModel
+from authentication.renderers import json_response, registered_user, user_profile
+from authentication.serializers import DUPLICATE_PHONE_ERROR, AsyncLoginSerializer, RegisterSerializer, insert_user
+from authentication.throttling import athrottle_wait
+from authentication.tokens import RefreshToken, grace_key
+from authentication.utils import get_country_from_phone
+from authentication.writebehind import last_login_buffer, outstanding_token_buffer
+
+
+class _AsyncRefreshToken(RefreshToken):
+    def check_blacklist(self):
+        # Checked by _ablacklist with the async ORM instead.
+        pass
+
+
+def _throttled(wait):
+    wait = math.ceil(wait)
+    response = json_response(
+        {"detail": f"Request was throttled. Expected available in {wait} seconds."},
+        status=429
+    )
+    response['Retry-After'] = str(wait)
+    return response
+
+
+@timed('authenticate')
+async def _aauthenticate(phone_number, password):
+    try:
+        user = await UserModel.objects.aget(phone_number=phone_number)
+    except UserModel.DoesNotExist:
+        # Hash anyway so unknown numbers take as long as wrong passwords,
+        # like ModelBackend does.
+        await amake_password(password)
+        return None
+
+    if not await acheck_password(password, user.password):
+        return None
+    if not user.is_active:
+        return None
+    return user
+
+
+@timed('token')
+async def _arefresh_token_for_user(user):
+    token = _AsyncRefreshToken()
+    token[api_settings.USER_ID_CLAIM] = getattr(user, api_settings.USER_ID_FIELD)
+    token.add_user_claims(user)
+    if outstanding_token_buffer.enabled:
+        token.record(user)
+    else:
+        await OutstandingToken.objects.acreate(**token.outstanding_fields(user))
+    return token
+
+
+async def _ablacklist(token):
+    jti = token[api_settings.JTI_CLAIM]
+    if await BlacklistedToken.objects.filter(token__jti=jti).aexists():
+        raise TokenError('Token is blacklisted')
+
+    defaults = outstanding_token_buffer.pop(jti)
+    if defaults is None:
+        user_id = token.get(api_settings.USER_ID_CLAIM)
+        user = await UserModel.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).afirst()
+        defaults = {
+            'user': user,
+            'created_at': token.current_time,
+            'token': str(token),
+            'expires_at': datetime_from_epoch(token['exp']),
+        }
+    else:
+        # Issued by this process and not flushed yet.
+        del defaults['jti']
+    outstanding, _ = await OutstandingToken.objects.aget_or_create(jti=jti, defaults=defaults)
+    await BlacklistedToken.objects.aget_or_create(token=outstanding)
+
+
+@csrf_exempt
+@require_POST
+async def register(request):
+    wait = await athrottle_wait(request, 'register')
+    if wait is not None:
+        return _throttled(wait)
+
+    serializer = RegisterSerializer(data=request.POST)
+    if not serializer.is_valid():
+        return json_response(serializer.errors, status=400)
+
+    data = serializer.validated_data
+    phone_number = UserModel.objects.normalize_phone_number(data['phone_number'])
+    user = UserModel(
+        phone_number=phone_number,
+        country=get_country_from_phone(phone_number) or data.get('country'),
+    )
+    user.password = await amake_password(data['password'])
+    try:
+        await sync_to_async(insert_user)(user)
+    except IntegrityError:
+        return json_response(DUPLICATE_PHONE_ERROR, status=400)
+
+    return json_response(
+        {
+            "message": "User registered successfully",
+            "user_info": registered_user(user)
+        },
+        status=201
+    )
+
+
+@csrf_exempt
+@require_POST
+async def login(request):
+    wait = await athrottle_wait(request, 'login')
+    if wait is not None:
+        return _throttled(wait)
+
+    serializer = AsyncLoginSerializer(data=request.POST)
+    if not serializer.is_valid():
+        return json_response(serializer.errors, status=400)
+
+    user = await _aauthenticate(
+        serializer.validated_data['phone_number'],
+        serializer.validated_data['password'],
+    )
+    if not user:
+        return json_response(
+            {"non_field_errors": ["Invalid phone number or password."]},
+            status=400
+        )
+
+    refresh = await _arefresh_token_for_user(user)
+    user.last_login = timezone.now()
+    if last_login_buffer.enabled:
+        last_login_buffer.add(user.pk, user.last_login)
+    else:
+        await user.asave(update_fields=['last_login'])
+
+    return json_response(
+        {
+            'access': str(refresh.access_token),
+            'refresh': str(refresh),
+            'user': user_profile(user)
+        },
+        status=200
+    )
+
+
+@csrf_exempt
+@require_POST
+async def logout(request):
+    refresh_token = request.POST.get('refresh')
+    if not refresh_token:
+        return json_response({"refresh": ["This field is required."]}, status=400)
+
+    try:
+        token = _AsyncRefreshToken(refresh_token)
+        await caches[app_settings.REFRESH_GRACE_CACHE].adelete(grace_key(token[api_settings.JTI_CLAIM]))
+        await _ablacklist(token)
+    except TokenError:
+        return json_response({"detail": ["Invalid token."]}, status=400)
+
+    return json_response({"message": "User logged out successfully"}, status=200)
@@ -0,0 +1,134 @@
+import hashlib
+import threading
+
+from django.contrib.auth import get_user_model
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from authentication.conf import app_settings
+from authentication.datastructures import LRUCache
+from authentication.tokens import USER_CLAIMS
+
+
+class VerifiedTokenCache:
+    """
+    Per-process LRU of validated access tokens, keyed by token digest.
+
+    The LRU is sized from VERIFIED_TOKEN_CACHE_SIZE when first used, and
+    again after reset().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._lru = None
+
+    def _cache(self):
+        lru = self._lru
+        if lru is None:
+            with self._lock:
+                if self._lru is None:
+                    self._lru = LRUCache(app_settings.VERIFIED_TOKEN_CACHE_SIZE)
+                lru = self._lru
+        return lru
+
+    def get(self, key):
+        return self._cache().get(key)
+
+    def set(self, key, token, expires_at=None):
+        self._cache().set(key, token, expires_at=expires_at)
+
+    def reset(self):
+        """Drop every entry and resize on the next use"""
+        self._lru = None
+
+    def stats(self):
+        return self._lru.stats() if self._lru is not None else None
+
+
+verified_token_cache = VerifiedTokenCache()
+
+
+class ClaimsUser(TokenUser):
+    """
+    Request user backed by the claims of a validated token.
+
+    is_verified, country, is_staff and is_superuser are read from the token,
+    any other attribute loads the user row on first access.
+    """
+
+    @cached_property
+    def is_verified(self):
+        return self.token['is_verified']
+
+    @cached_property
+    def country(self):
+        return self.token['country']
+
+    @cached_property
+    def is_staff(self):
+        return self.token['is_staff']
+
+    @cached_property
+    def is_superuser(self):
+        return self.token['is_superuser']
+
+    @cached_property
+    def instance(self):
+        """The UserModel row of this user, loaded on first access"""
+        return get_user_model().objects.get(pk=self.pk)
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.instance, name)
+
+    def __str__(self):
+        return str(self.instance)
+
+    def __eq__(self, other):
+        # Equal to the UserModel row it stands for, as a loaded user would
+        # be, so checks like obj == request.user keep working.
+        if isinstance(other, (TokenUser, get_user_model())):
+            return self.pk is not None and self.pk == other.pk
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    def __hash__(self):
+        return hash(self.pk)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that, with CLAIMS_ONLY_USER enabled, returns a
+    ClaimsUser instead of loading the user row. Tokens issued before the
+    claims were embedded fall back to the database lookup.
+
+    Claims are trusted until the access token expires, so deactivating a
+    user or changing is_verified takes effect on the next login or refresh.
+
+    Validated tokens are kept in verified_token_cache until their exp,
+    so a token sent again skips decoding and signature verification.
+    """
+
+    def get_validated_token(self, raw_token):
+        if not app_settings.VERIFIED_TOKEN_CACHE_ENABLED:
+            return super().get_validated_token(raw_token)
+
+        key = hashlib.blake2b(raw_token, digest_size=16).digest()
+        token = verified_token_cache.get(key)
+        if token is None:
+            token = super().get_validated_token(raw_token)
+            verified_token_cache.set(key, token, expires_at=token.get('exp'))
+        return token
+
+    def get_user(self, validated_token):
+        if app_settings.CLAIMS_ONLY_USER and all(
+            claim in validated_token for claim in (api_settings.USER_ID_CLAIM, *USER_CLAIMS)
+        ):
+            return ClaimsUser(validated_token)
+        return super().get_user(validated_token)
@@ -0,0 +1,34 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from authentication.hashing import hash_password, verify_password_pooled
+
+UserModel = get_user_model()
+
+
+class PooledModelBackend(ModelBackend):
+    """
+    ModelBackend that checks passwords on the hashing process pool instead
+    of the request thread.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Run the default password hasher once to reduce the timing
+            # difference between an existing and a nonexistent user.
+            hash_password(password)
+            return
+
+        is_correct, must_update = verify_password_pooled(password, user.password)
+        if not is_correct or not self.user_can_authenticate(user):
+            return
+        if must_update:
+            user.set_password(password)
+            user.save(update_fields=['password'])
+        return user
@@ -0,0 +1,113 @@
+from django.db import IntegrityError, transaction
+
+from authentication.conf import app_settings
+from authentication.hashing import make_passwords
+from authentication.models import UserModel
+from authentication.registry import phone_registry
+from authentication.serializers import DUPLICATE_PHONE_ERROR, BatchRegisterRowSerializer
+from authentication.utils import get_country_from_phone
+
+
+def _created(index, user):
+    return {
+        'index': index,
+        'status': 'created',
+        'id': user.pk,
+        'phone_number': user.phone_number,
+        'country': user.country,
+    }
+
+
+def _failed(index, errors):
+    return {'index': index, 'status': 'error', 'errors': errors}
+
+
+def _build_users(rows):
+    passwords = make_passwords(data['password'] for _, data in rows)
+    users = []
+    for (_, data), password in zip(rows, passwords):
+        phone_number = data['phone_number']
+        user = UserModel(
+            phone_number=phone_number,
+            country=get_country_from_phone(phone_number) or data.get('country'),
+            password=password,
+        )
+        # bulk_create doesn't call save()
+        user.set_phone_digits()
+        users.append(user)
+    return users
+
+
+def _create_chunk(rows, results):
+    phone_numbers = [data['phone_number'] for _, data in rows]
+    existing = set(
+        UserModel.objects.filter(phone_number__in=phone_numbers)
+        .values_list('phone_number', flat=True)
+    )
+    for index, data in rows:
+        if data['phone_number'] in existing:
+            results[index] = _failed(index, DUPLICATE_PHONE_ERROR)
+    rows = [(index, data) for index, data in rows if data['phone_number'] not in existing]
+    if not rows:
+        return
+
+    users = _build_users(rows)
+    try:
+        with transaction.atomic():
+            UserModel.objects.bulk_create(users)
+    except IntegrityError:
+        # A concurrent registration took one of the numbers after the
+        # existence check, so fall back to row-by-row inserts.
+        for (index, _), user in zip(rows, users):
+            user.pk = None
+            try:
+                with transaction.atomic():
+                    user.save()
+            except IntegrityError:
+                results[index] = _failed(index, DUPLICATE_PHONE_ERROR)
+            else:
+                results[index] = _created(index, user)
+        return
+
+    for (index, _), user in zip(rows, users):
+        # bulk_create doesn't send post_save
+        phone_registry.add(user.phone_number)
+        results[index] = _created(index, user)
+
+
+def register_batch(rows):
+    """
+    Validate and create many users at once.
+
+    Returns one result per input row, in input order. Passwords are hashed
+    in parallel and users are inserted with chunked bulk_create calls.
+    """
+    results = [None] * len(rows)
+    pending = []
+    seen = set()
+
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            results[index] = _failed(index, {'non_field_errors': ['Expected an object.']})
+            continue
+
+        serializer = BatchRegisterRowSerializer(data=row)
+        if not serializer.is_valid():
+            results[index] = _failed(index, serializer.errors)
+            continue
+
+        data = serializer.validated_data
+        data['phone_number'] = UserModel.objects.normalize_phone_number(data['phone_number'])
+        if data['phone_number'] in seen:
+            results[index] = _failed(index, {
+                'phone_number': ['Phone number appears more than once in this batch.']
+            })
+            continue
+        seen.add(data['phone_number'])
+        pending.append((index, data))
+
+    chunk_size = app_settings.BATCH_REGISTER_CHUNK_SIZE
+    for start in range(0, len(pending), chunk_size):
+        _create_chunk(pending[start:start + chunk_size], results)
+
+    return results
@@ -0,0 +1,8 @@
+"""
+Offline benchmarks for the authentication endpoints.
+
+Load scenarios drive the WSGI and ASGI applications from config.wsgi and
+config.asgi in-process with concurrent clients against a throwaway test
+database. Micro-benchmarks time the hot helpers on their own. Results are
+compared with a stored baseline by `manage.py benchmark`.
+"""
@@ -0,0 +1,63 @@
+"""
+Stored benchmark baselines and regression checks.
+"""
+import json
+from pathlib import Path
+
+LATENCY_METRICS = ('p50', 'p95', 'p99')
+
+
+def load_baseline(path):
+    path = Path(path)
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def save_baseline(path, results):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, indent=2, sort_keys=True) + '\n')
+
+
+def _slower(current, baseline, threshold):
+    return baseline and current > baseline * (1 + threshold)
+
+
+def _error_rate(result):
+    return result.get('errors', 0) / result['requests'] if result.get('requests') else 0.0
+
+
+def find_regressions(results, baseline, threshold):
+    """
+    Describe every metric that got worse than the baseline by more than
+    threshold, a fraction, and any rise in load errors or error rate,
+    whatever the threshold. Metrics missing from either side are skipped.
+    """
+    regressions = []
+    for name, current in results.get('load', {}).items():
+        previous = baseline.get('load', {}).get(name)
+        if previous is None:
+            continue
+        for metric in LATENCY_METRICS:
+            if _slower(current[metric], previous[metric], threshold):
+                regressions.append(f"{name} {metric}: {current[metric]:.2f}ms, baseline {previous[metric]:.2f}ms")
+        if current['throughput'] < previous['throughput'] * (1 - threshold):
+            regressions.append(
+                f"{name} throughput: {current['throughput']:.1f}/s, baseline {previous['throughput']:.1f}/s"
+            )
+        errors, previous_errors = current.get('errors', 0), previous.get('errors', 0)
+        if errors > previous_errors or _error_rate(current) > _error_rate(previous):
+            regressions.append(
+                f"{name} errors: {errors} ({_error_rate(current):.2%}), "
+                f"baseline {previous_errors} ({_error_rate(previous):.2%})"
+            )
+    for name, current in results.get('micro', {}).items():
+        previous = baseline.get('micro', {}).get(name)
+        if previous is not None and _slower(current, previous, threshold):
+            regressions.append(f"{name}: {current:.2f}us, baseline {previous:.2f}us")
+    for name, current in results.get('startup', {}).items():
+        previous = baseline.get('startup', {}).get(name)
+        if previous is not None and _slower(current, previous, threshold):
+            regressions.append(f"startup {name}: {current:.2f}ms, baseline {previous:.2f}ms")
+    return regressions
@@ -0,0 +1,139 @@
+"""
+In-process WSGI and ASGI clients and the concurrent load runner.
+"""
+import asyncio
+import io
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+FORM_CONTENT_TYPE = 'application/x-www-form-urlencoded'
+
+
+def _encode(data):
+    return urlencode(data or {}).encode()
+
+
+def wsgi_request(app, path, data=None, method='POST'):
+    """Send form data, or a query string for GET, to a WSGI app, returns the status code"""
+    if method == 'GET':
+        body, query_string = b'', _encode(data).decode()
+    else:
+        body, query_string = _encode(data), ''
+    environ = {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'QUERY_STRING': query_string,
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'REMOTE_ADDR': '127.0.0.1',
+        'CONTENT_TYPE': FORM_CONTENT_TYPE,
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': io.StringIO(),
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    status = []
+
+    def start_response(status_line, headers, exc_info=None):
+        status.append(int(status_line.split(' ', 1)[0]))
+
+    result = app(environ, start_response)
+    try:
+        for _ in result:
+            pass
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return status[0]
+
+
+async def asgi_request(app, path, data=None):
+    """POST form data to an ASGI app, returns the status code"""
+    body = _encode(data)
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'POST',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': [
+            (b'host', b'localhost'),
+            (b'content-type', FORM_CONTENT_TYPE.encode()),
+            (b'content-length', str(len(body)).encode()),
+        ],
+        'client': ('127.0.0.1', 50000),
+        'server': ('localhost', 80),
+    }
+    sent = False
+    status = []
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+        # The client stays connected until the response is complete, the
+        # handler cancels this wait when it is done.
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    await app(scope, receive, send)
+    return status[0]
+
+
+def summarize(latencies, elapsed, statuses, expected_status):
+    """Percentiles in milliseconds and throughput in requests per second"""
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+    return {
+        'requests': len(latencies),
+        'errors': sum(1 for status in statuses if status != expected_status),
+        'p50': cuts[49] * 1000,
+        'p95': cuts[94] * 1000,
+        'p99': cuts[98] * 1000,
+        'throughput': len(latencies) / elapsed if elapsed else 0.0,
+    }
+
+
+def run_wsgi_load(app, path, payloads, concurrency, expected_status):
+    def timed(data):
+        started = time.perf_counter()
+        status = wsgi_request(app, path, data)
+        return time.perf_counter() - started, status
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        results = list(executor.map(timed, payloads))
+    elapsed = time.perf_counter() - started
+    return summarize([latency for latency, _ in results], elapsed, [status for _, status in results], expected_status)
+
+
+def run_asgi_load(app, path, payloads, concurrency, expected_status):
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def timed(data):
+            async with semaphore:
+                started = time.perf_counter()
+                status = await asgi_request(app, path, data)
+                return time.perf_counter() - started, status
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(timed(data) for data in payloads))
+        return results, time.perf_counter() - started
+
+    results, elapsed = asyncio.run(main())
+    return summarize([latency for latency, _ in results], elapsed, [status for _, status in results], expected_status)
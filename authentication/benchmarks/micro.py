@@ -0,0 +1,89 @@
+"""
+Micro-benchmarks of the per-request helpers, in microseconds per call.
+"""
+import timeit
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.test.utils import override_settings
+
+from authentication.benchmarks.drivers import wsgi_request
+from authentication.models import UserModel
+from authentication.renderers import user_profile
+from authentication.serializers import RegisterSerializer, UserProfileSerializer
+from authentication.tokens import RefreshToken
+from authentication.utils import validate_phone_number
+
+
+def _benchmarks():
+    user = UserModel(
+        id=1,
+        phone_number='+998901234567',
+        country='Uzbekistan',
+        is_verified=True,
+        date_joined=datetime(2025, 1, 2, 3, 4, 5, tzinfo=dt_timezone.utc),
+        created_at=datetime(2025, 1, 2, 3, 4, 5, tzinfo=dt_timezone.utc),
+        updated_at=datetime(2025, 1, 2, 3, 4, 5, tzinfo=dt_timezone.utc),
+    )
+    register_data = {
+        'phone_number': '+998909999999',
+        'password': 'Benchmark123',
+        'password_confirm': 'Benchmark123',
+        'country': 'Uzbekistan',
+    }
+
+    def mint_tokens():
+        token = RefreshToken.issue(user)
+        return str(token), str(token.access_token)
+
+    return {
+        'validate_phone_number': lambda: validate_phone_number('+998901234567'),
+        'register_serializer_is_valid': lambda: RegisterSerializer(data=register_data).is_valid(),
+        'user_profile_serializer': lambda: UserProfileSerializer(user).data,
+        'user_profile_compiled': lambda: user_profile(user),
+        'token_minting': mint_tokens,
+    }
+
+
+def _time(func, repeat):
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e6
+
+
+def run_middleware_comparison(repeat=5):
+    """
+    A cheap API request through the whole WSGI app, once with every
+    middleware and once with the MIDDLEWARE_PROFILES of the settings.
+    Throttling is off for the run, timing a 429 would measure nothing.
+    """
+    from config.wsgi import application
+
+    def request():
+        status = wsgi_request(
+            application, '/en/api/v1/auth/phone/available/',
+            {'phone_number': '+998909999999'}, method='GET',
+        )
+        if status != 200:
+            raise RuntimeError(f'Middleware benchmark request returned {status}')
+
+    unthrottled = {**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {}}
+    results = {}
+    for name, profiles in (
+        ('api_request_full_stack', {}),
+        ('api_request_lean_stack', settings.AUTHENTICATION.get('MIDDLEWARE_PROFILES', {})),
+    ):
+        with override_settings(
+            AUTHENTICATION={**settings.AUTHENTICATION, 'MIDDLEWARE_PROFILES': profiles},
+            REST_FRAMEWORK=unthrottled,
+        ):
+            request()
+            results[name] = _time(request, repeat)
+    return results
+
+
+def run_micro(repeat=5):
+    """Best of repeat runs for every micro-benchmark"""
+    results = {name: _time(func, repeat) for name, func in _benchmarks().items()}
+    results.update(run_middleware_comparison(repeat))
+    return results
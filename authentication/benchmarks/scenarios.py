@@ -0,0 +1,68 @@
+"""
+Load scenarios. Each one prepares its users and tokens up front and
+returns one form payload per request, so only the request itself is timed.
+"""
+import itertools
+from collections import namedtuple
+
+from authentication.batch import register_batch
+from authentication.models import UserModel
+from authentication.tokens import RefreshToken
+from authentication.writebehind import outstanding_token_buffer
+
+PASSWORD = 'Benchmark123'
+USER_POOL_SIZE = 20
+
+Scenario = namedtuple('Scenario', ['name', 'path', 'async_path', 'prepare', 'expected_status'])
+
+_phone_numbers = (f'+99893{n:07d}' for n in itertools.count())
+
+
+def _user_pool():
+    users = list(UserModel.objects.filter(phone_number__startswith='+99893')[:USER_POOL_SIZE])
+    missing = USER_POOL_SIZE - len(users)
+    if missing:
+        register_batch([
+            {'phone_number': next(_phone_numbers), 'password': PASSWORD, 'password_confirm': PASSWORD}
+            for _ in range(missing)
+        ])
+        users = list(UserModel.objects.filter(phone_number__startswith='+99893')[:USER_POOL_SIZE])
+    return users
+
+
+def _refresh_tokens(count):
+    users = itertools.cycle(_user_pool())
+    tokens = [str(RefreshToken.for_user(next(users))) for _ in range(count)]
+    outstanding_token_buffer.flush()
+    return tokens
+
+
+def prepare_register(count):
+    return [
+        {'phone_number': next(_phone_numbers), 'password': PASSWORD,
+         'password_confirm': PASSWORD, 'country': 'Uzbekistan'}
+        for _ in range(count)
+    ]
+
+
+def prepare_login(count):
+    users = itertools.cycle(_user_pool())
+    return [{'phone_number': next(users).phone_number, 'password': PASSWORD} for _ in range(count)]
+
+
+def prepare_refresh(count):
+    return [{'refresh': token} for token in _refresh_tokens(count)]
+
+
+def prepare_logout(count):
+    return [{'refresh': token} for token in _refresh_tokens(count)]
+
+
+SCENARIOS = {
+    scenario.name: scenario for scenario in (
+        Scenario('register', '/en/api/v1/auth/register/', '/en/api/v1/auth/async/register/', prepare_register, 201),
+        Scenario('login', '/en/api/v1/auth/login/', '/en/api/v1/auth/async/login/', prepare_login, 200),
+        Scenario('refresh', '/en/api/v1/auth/refresh/', None, prepare_refresh, 200),
+        Scenario('logout', '/en/api/v1/auth/logout/', '/en/api/v1/auth/async/logout/', prepare_logout, 200),
+    )
+}
@@ -0,0 +1,45 @@
+"""
+Cold-start timings, each measured in a fresh interpreter.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+
+# Runs in the child: loads the WSGI application, then sends it a login
+# request that fails validation, so it never touches the database.
+CHILD_SCRIPT = """
+import json, time
+started = time.perf_counter()
+from config.wsgi import application
+loaded = time.perf_counter()
+from authentication.benchmarks.drivers import wsgi_request
+status = wsgi_request(application, '/en/api/v1/auth/login/', {})
+answered = time.perf_counter()
+print(json.dumps({
+    'app_load_ms': (loaded - started) * 1000,
+    'first_request_ms': (answered - loaded) * 1000,
+    'status': status,
+}))
+"""
+
+
+def _measure_once():
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'config.settings'}
+    completed = subprocess.run(
+        [sys.executable, '-c', CHILD_SCRIPT],
+        cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def measure_startup(repeat=5):
+    """Median milliseconds to load the WSGI application and serve its first request"""
+    runs = [_measure_once() for _ in range(repeat)]
+    return {
+        metric: statistics.median(run[metric] for run in runs)
+        for metric in ('app_load_ms', 'first_request_ms')
+    }
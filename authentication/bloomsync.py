@@ -0,0 +1,143 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from authentication.conf import app_settings
+from authentication.datastructures import BloomFilter
+
+
+class PolledBloomFilter(ABC):
+    """
+    Per-process answer to "is this value in the table?", from a bloom
+    filter of one column.
+
+    The filter is built in one streaming pass on first use, or earlier by
+    prepare(). Values saved by this process are added through add(), rows
+    written by other processes by polling for higher ids, at most every
+    sync interval. Bloom hits are confirmed against the database.
+
+    Ids are assigned at insert but rows become visible at commit, so a row
+    can commit below the highest id already read. Every poll therefore
+    re-reads the last rescan window ids as well.
+
+    The filter and the optional cache of confirmed hits are replaced
+    together, fully built, so readers never see a partial or missing
+    filter. Subclasses name the model, column and settings.
+    """
+    value_field = None
+    capacity_setting = None
+    error_rate_setting = None
+    sync_interval_setting = None
+    rescan_window_setting = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = None
+        self._stale = False
+        self._last_id = 0
+        self._last_sync = 0.0
+        self.negatives = 0
+        self.confirmed = 0
+        self.false_positives = 0
+
+    @abstractmethod
+    def get_queryset(self):
+        """The rows whose value_field is in the filter"""
+
+    def new_cache(self):
+        """An empty cache of confirmed values, or None to confirm every hit"""
+        return None
+
+    def needs_rebuild(self, bloom):
+        # Past capacity the error rate degrades quickly, rebuild bigger.
+        return len(bloom) >= bloom.capacity
+
+    @property
+    def _sync_interval(self):
+        return getattr(app_settings, self.sync_interval_setting)
+
+    def _pull(self, bloom, last_id):
+        """Add the rows above last_id, minus the rescan window, returns the new last id"""
+        start = max(last_id - getattr(app_settings, self.rescan_window_setting), 0)
+        rows = (
+            self.get_queryset().filter(id__gt=start)
+            .order_by('id')
+            .values_list('id', self.value_field)
+            .iterator(chunk_size=10000)
+        )
+        for row_id, value in rows:
+            bloom.add(value)
+            last_id = max(last_id, row_id)
+        self._last_sync = time.monotonic()
+        return last_id
+
+    def _load(self):
+        capacity = max(
+            getattr(app_settings, self.capacity_setting),
+            self.get_queryset().count() * 2,
+        )
+        bloom = BloomFilter(capacity, getattr(app_settings, self.error_rate_setting))
+        self._last_id = self._pull(bloom, 0)
+        self._state = (bloom, self.new_cache())
+        self._stale = False
+
+    def _refresh(self):
+        """Sync if due, returns the current (bloom filter, cache)"""
+        state = self._state
+        if state is not None and not self._stale and (
+            time.monotonic() - self._last_sync < self._sync_interval
+        ):
+            return state
+        with self._lock:
+            bloom = self._state[0] if self._state is not None else None
+            if bloom is None or self._stale or self.needs_rebuild(bloom):
+                self._load()
+            elif time.monotonic() - self._last_sync >= self._sync_interval:
+                self._last_id = self._pull(bloom, self._last_id)
+            return self._state
+
+    def prepare(self):
+        """Build the filter now instead of on first use"""
+        self._refresh()
+
+    def contains(self, value):
+        bloom, cache = self._refresh()
+        if value not in bloom:
+            self.negatives += 1
+            return False
+        if cache is not None and cache.get(value):
+            return True
+
+        found = self.get_queryset().filter(**{self.value_field: value}).exists()
+        if found:
+            self.confirmed += 1
+            if cache is not None:
+                cache.set(value, True)
+        else:
+            self.false_positives += 1
+        return found
+
+    def add(self, value):
+        """Record a value saved by this process"""
+        if self._state is None:
+            return
+        with self._lock:
+            bloom, cache = self._state
+            bloom.add(value)
+            if cache is not None:
+                cache.set(value, True)
+
+    def reset(self):
+        """Rebuild from the database on the next check"""
+        self._stale = True
+
+    def stats(self):
+        bloom, cache = self._state or (None, None)
+        return {
+            'bloom': bloom.stats() if bloom is not None else None,
+            'cache': cache.stats() if cache is not None else None,
+            'last_id': self._last_id,
+            'negatives': self.negatives,
+            'confirmed': self.confirmed,
+            'false_positives': self.false_positives,
+        }
@@ -0,0 +1,37 @@
+from django.core.cache import InvalidCacheBackendError, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Error, Tags, register
+from rest_framework_simplejwt.settings import api_settings
+
+from authentication.conf import app_settings
+
+# Backends that keep entries in the current process only.
+PROCESS_LOCAL_CACHES = (LocMemCache, DummyCache)
+
+
+@register(Tags.caches)
+def check_refresh_grace_cache(app_configs, **kwargs):
+    """
+    Refresh rotation decides the winner of concurrent refreshes on the
+    grace cache. A per-process cache lets two workers both rotate the same
+    token, so it fails the check instead of misbehaving under load.
+    """
+    if not api_settings.ROTATE_REFRESH_TOKENS:
+        return []
+    alias = app_settings.REFRESH_GRACE_CACHE
+    try:
+        cache = caches[alias]
+    except InvalidCacheBackendError:
+        return [Error(
+            f"AUTHENTICATION['REFRESH_GRACE_CACHE'] refers to the undefined cache {alias!r}.",
+            id='authentication.E001',
+        )]
+    if isinstance(cache, PROCESS_LOCAL_CACHES):
+        return [Error(
+            f"AUTHENTICATION['REFRESH_GRACE_CACHE'] uses {type(cache).__name__}, which is not "
+            f"shared between worker processes.",
+            hint="Point it at a Redis, Memcached or database cache.",
+            id='authentication.E002',
+        )]
+    return []
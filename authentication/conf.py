@@ -0,0 +1,77 @@
+from django.conf import settings
+
+DEFAULTS = {
+    # Batch registration
+    'BATCH_REGISTER_MAX_ROWS': 10000,
+    'BATCH_REGISTER_CHUNK_SIZE': 500,
+    # Password hashing
+    'PASSWORD_HASHING_WORKERS': None,
+    'PASSWORD_POOL_ENABLED': True,
+    'PASSWORD_POOL_WORKERS': None,
+    'PASSWORD_POOL_TIMEOUT': 5,
+    'PASSWORD_POOL_PRESTART': True,
+    # Refresh token revocation cache
+    'REVOCATION_CACHE_ENABLED': True,
+    'REVOCATION_BLOOM_CAPACITY': 1000000,
+    'REVOCATION_BLOOM_ERROR_RATE': 0.001,
+    'REVOCATION_LRU_SIZE': 10000,
+    'REVOCATION_SYNC_INTERVAL': 2,
+    'REVOCATION_RESCAN_WINDOW': 1000,
+    # Phone availability
+    'PHONE_BLOOM_CAPACITY': 1000000,
+    'PHONE_BLOOM_ERROR_RATE': 0.001,
+    'PHONE_REGISTRY_SYNC_INTERVAL': 2,
+    'PHONE_REGISTRY_RESCAN_WINDOW': 1000,
+    # JWT authentication
+    'CLAIMS_ONLY_USER': False,
+    'VERIFIED_TOKEN_CACHE_ENABLED': True,
+    'VERIFIED_TOKEN_CACHE_SIZE': 10000,
+    # Rate limiting
+    'THROTTLE_CACHE': 'default',
+    # Write-behind buffers
+    'LAST_LOGIN_WRITE_BEHIND': True,
+    'OUTSTANDING_TOKEN_WRITE_BEHIND': True,
+    'WRITE_BEHIND_INTERVAL': 5,
+    'WRITE_BEHIND_MAX_PENDING': 1000,
+    'WRITE_BEHIND_MAX_ATTEMPTS': 3,
+    # Read replicas
+    'DATABASE_REPLICAS': [],
+    'REPLICA_LAG_TOLERANCE': 5,
+    'REPLICA_PIN_COOKIE': 'primary_pin',
+    # OpenAPI schema
+    'SCHEMA_DIR': None,
+    'SCHEMA_MAX_AGE': 3600,
+    # Instrumentation
+    'METRICS_ENABLED': True,
+    'SERVER_TIMING_HEADER': False,
+    'METRICS_ALLOWED_IPS': ['127.0.0.1', '::1'],
+    # Startup
+    'WARMUP_ON_STARTUP': True,
+    # Middleware skipped per route prefix
+    'MIDDLEWARE_PROFILES': {},
+    # Admin changelist
+    'ADMIN_EXACT_COUNT_LIMIT': 10000,
+    # User export
+    'EXPORT_BATCH_SIZE': 2000,
+    # Token pruning
+    'TOKEN_PRUNE_BATCH_SIZE': 5000,
+    'TOKEN_PRUNE_SLEEP': 0.1,
+    # Token refresh
+    'REFRESH_GRACE_CACHE': 'default',
+    'REFRESH_GRACE_PERIOD': 30,
+}
+
+
+class AppSettings:
+    """
+    Settings of the authentication app, read from the AUTHENTICATION dict
+    in the project settings with a fallback to DEFAULTS.
+    """
+
+    def __getattr__(self, name):
+        if name not in DEFAULTS:
+            raise AttributeError(f"Invalid authentication setting: '{name}'")
+        return getattr(settings, 'AUTHENTICATION', {}).get(name, DEFAULTS[name])
+
+
+app_settings = AppSettings()
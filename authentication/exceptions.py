@@ -1,6 +1,16 @@
 from rest_framework.views import exception_handler
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class PasswordPoolBusy(APIException):
+    """
+    A password check timed out while already running on the pool.
+    """
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'The server is busy, please try again shortly.'
+    default_code = 'password_pool_busy'
 
 
 def custom_exception_handler(exc, context):
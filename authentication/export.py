@@ -0,0 +1,88 @@
+"""
+Streaming export of the user table as CSV or NDJSON.
+
+Rows are read in keyset windows of EXPORT_BATCH_SIZE ids with
+values_list, so memory stays flat however large the table is and every
+query is a short index range scan instead of one transaction held open
+for the whole export. Rows come out in id order; to resume a stopped
+export, pass the last exported id as after_id.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+
+from authentication.conf import app_settings
+from authentication.models import UserModel
+
+EXPORT_FIELDS = (
+    'id', 'phone_number', 'country', 'is_verified', 'is_active',
+    'date_joined', 'last_login', 'created_at', 'updated_at',
+)
+
+
+def export_queryset(country=None, is_verified=None, created_after=None, created_before=None):
+    """Users matching the filters; created_after is inclusive, created_before exclusive"""
+    queryset = UserModel.objects.all()
+    if country is not None:
+        queryset = queryset.filter(country=country)
+    if is_verified is not None:
+        queryset = queryset.filter(is_verified=is_verified)
+    if created_after is not None:
+        queryset = queryset.filter(created_at__gte=created_after)
+    if created_before is not None:
+        queryset = queryset.filter(created_at__lt=created_before)
+    return queryset
+
+
+def iter_batches(queryset, after_id=0, batch_size=None):
+    """Yield lists of EXPORT_FIELDS tuples with ids above after_id, in id order"""
+    batch_size = batch_size or app_settings.EXPORT_BATCH_SIZE
+    rows = queryset.order_by('pk').values_list(*EXPORT_FIELDS)
+    while True:
+        batch = list(rows.filter(pk__gt=after_id)[:batch_size])
+        if not batch:
+            return
+        yield batch
+        after_id = batch[-1][0]
+
+
+def _value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def csv_chunks(batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for batch in batches:
+        writer.writerows([_value(value) for value in row] for row in batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # The header alone, for an empty export.
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def ndjson_chunks(batches):
+    for batch in batches:
+        yield ''.join(
+            json.dumps(dict(zip(EXPORT_FIELDS, map(_value, row))), ensure_ascii=False) + '\n'
+            for row in batch
+        )
+
+
+# Format name: (chunk encoder, content type, file extension)
+FORMATS = {
+    'csv': (csv_chunks, 'text/csv; charset=utf-8', 'csv'),
+    'ndjson': (ndjson_chunks, 'application/x-ndjson; charset=utf-8', 'ndjson'),
+}
+
+
+def export_users(output_format, after_id=0, batch_size=None, **filters):
+    """Yield the export as text chunks, one per batch of rows"""
+    encode = FORMATS[output_format][0]
+    return encode(iter_batches(export_queryset(**filters), after_id, batch_size))
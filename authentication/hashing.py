@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from django.contrib.auth.hashers import check_password, make_password, verify_password
+
+from authentication.conf import app_settings
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+_process_pool = None
+_process_pool_pid = None
+_process_pool_lock = threading.Lock()
+_process_pool_retry_at = 0.0
+
+# Seconds to hash inline after the pool failed before trying it again.
+POOL_RETRY_DELAY = 60
+
+
+def get_executor():
+    """
+    Return the shared hashing executor, creating it on first use.
+
+    PBKDF2 runs inside OpenSSL with the GIL released, so a thread pool
+    spreads the work across all cores.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = app_settings.PASSWORD_HASHING_WORKERS or os.cpu_count() or 1
+                _executor = ThreadPoolExecutor(
+                    max_workers=workers,
+                    thread_name_prefix='password-hashing',
+                )
+    return _executor
+
+
+def make_passwords(raw_passwords):
+    """Hash a sequence of raw passwords in parallel, preserving order"""
+    raw_passwords = list(raw_passwords)
+    if len(raw_passwords) < 2:
+        return [make_password(password) for password in raw_passwords]
+    return list(get_executor().map(make_password, raw_passwords))
+
+
+async def amake_password(raw_password):
+    """Hash a password on the hashing executor without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), make_password, raw_password)
+
+
+async def acheck_password(raw_password, encoded):
+    """Check a password on the hashing executor without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), check_password, raw_password, encoded)
+
+
+def _init_pool_worker(settings_module):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup(set_prefix=False)
+
+
+def _noop():
+    return None
+
+
+def get_process_pool():
+    """
+    Return the password process pool, creating and warming it on first use.
+
+    Workers are started through a fork server so they never inherit the
+    locks of a threaded server process. A forked child doesn't inherit a
+    working pool either, so it creates its own.
+    """
+    global _process_pool, _process_pool_pid
+    if _process_pool is None or _process_pool_pid != os.getpid():
+        with _process_pool_lock:
+            if _process_pool is None or _process_pool_pid != os.getpid():
+                workers = app_settings.PASSWORD_POOL_WORKERS or os.cpu_count() or 1
+                pool = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context('forkserver'),
+                    initializer=_init_pool_worker,
+                    initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'config.settings'),),
+                )
+                for future in [pool.submit(_noop) for _ in range(workers)]:
+                    future.result()
+                _process_pool = pool
+                _process_pool_pid = os.getpid()
+    return _process_pool
+
+
+def prestart_process_pool():
+    """
+    Start the pool while the server loads, so the first login doesn't pay
+    for starting the fork server and its workers.
+    """
+    if app_settings.PASSWORD_POOL_ENABLED and app_settings.PASSWORD_POOL_PRESTART:
+        get_process_pool()
+
+
+def shutdown_process_pool(retry_delay=0):
+    global _process_pool, _process_pool_retry_at
+    with _process_pool_lock:
+        _process_pool_retry_at = time.monotonic() + retry_delay
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False, cancel_futures=True)
+            _process_pool = None
+
+
+def _run_pooled(func, *args):
+    """
+    Run func on the process pool, or inline when the pool is disabled or
+    broken.
+
+    When the pool doesn't answer within PASSWORD_POOL_TIMEOUT seconds, a
+    job that hasn't started is cancelled and run inline. A job already
+    running is left to finish and PasswordPoolBusy is raised, since
+    hashing it again here would double the cost while the pool is
+    saturated.
+    """
+    if not app_settings.PASSWORD_POOL_ENABLED or time.monotonic() < _process_pool_retry_at:
+        return func(*args)
+    try:
+        future = get_process_pool().submit(func, *args)
+        return future.result(timeout=app_settings.PASSWORD_POOL_TIMEOUT)
+    except FutureTimeoutError:
+        if not future.cancel():
+            # Imported here, pool workers load this module before Django.
+            from authentication.exceptions import PasswordPoolBusy
+
+            logger.warning('Password pool timed out')
+            raise PasswordPoolBusy()
+        logger.warning('Password pool timed out before starting the job, hashing inline')
+    except (BrokenProcessPool, RuntimeError, OSError):
+        logger.exception('Password pool failed, hashing inline')
+        shutdown_process_pool(retry_delay=POOL_RETRY_DELAY)
+    return func(*args)
+
+
+def hash_password(raw_password):
+    """make_password() on the process pool"""
+    if raw_password is None:
+        return make_password(None)
+    return _run_pooled(make_password, raw_password)
+
+
+def verify_password_pooled(raw_password, encoded):
+    """
+    verify_password() on the process pool, returns (is_correct, must_update)
+    """
+    return _run_pooled(verify_password, raw_password, encoded)
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from authentication.models import UserModel
+
+
+class Command(BaseCommand):
+    help = "Fill phone_digits and phone_digits_reversed for users saved before those columns existed"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        queryset = UserModel.objects.filter(phone_digits='').only('id', 'phone_number').order_by('pk')
+        last_pk = 0
+        updated = 0
+        while True:
+            users = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+            if not users:
+                break
+            for user in users:
+                user.set_phone_digits()
+            UserModel.objects.bulk_update(users, ['phone_digits', 'phone_digits_reversed'])
+            last_pk = users[-1].pk
+            updated += len(users)
+        self.stdout.write(f"Updated {updated} users")
@@ -0,0 +1,140 @@
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import override_settings, setup_databases, teardown_databases
+
+from authentication.benchmarks.baseline import find_regressions, load_baseline, save_baseline
+from authentication.benchmarks.drivers import run_asgi_load, run_wsgi_load
+from authentication.benchmarks.micro import run_micro
+from authentication.benchmarks.scenarios import SCENARIOS
+from authentication.benchmarks.startup import measure_startup
+from authentication.writebehind import last_login_buffer, outstanding_token_buffer
+
+INTERFACES = ('wsgi', 'asgi')
+
+
+class Command(BaseCommand):
+    help = "Run the offline load and micro-benchmarks on a throwaway test database, measure cold start and compare with the baseline"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scenario', action='append', dest='scenarios', choices=sorted(SCENARIOS),
+            help="Load scenario to run, may be repeated. Defaults to all scenarios.",
+        )
+        parser.add_argument(
+            '--interface', action='append', dest='interfaces', choices=INTERFACES,
+            help="Application to drive, may be repeated. Defaults to both.",
+        )
+        parser.add_argument('--requests', type=int, default=200, help="Requests per scenario")
+        parser.add_argument('--concurrency', type=int, default=16, help="Concurrent clients")
+        parser.add_argument('--skip-load', action='store_true', help="Skip the load scenarios")
+        parser.add_argument('--skip-micro', action='store_true', help="Skip the micro-benchmarks")
+        parser.add_argument('--skip-startup', action='store_true', help="Skip the cold-start measurement")
+        parser.add_argument(
+            '--baseline', default=settings.BASE_DIR / 'benchmarks' / 'baseline.json',
+            help="Baseline file to compare with",
+        )
+        parser.add_argument('--save-baseline', action='store_true', help="Store these results as the baseline")
+        parser.add_argument(
+            '--threshold', type=float, default=0.2,
+            help="Allowed slowdown against the baseline as a fraction, default 0.2",
+        )
+
+    def handle(self, *args, **options):
+        if options['requests'] < 2:
+            raise CommandError("--requests must be at least 2.")
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            self.use_sqlite_files(Path(tmpdir))
+            results = self.run(options)
+        if not options['skip_startup']:
+            results['startup'] = self.run_startup()
+        self.report(results, options)
+
+    def use_sqlite_files(self, directory):
+        # SQLite test databases default to shared in-memory ones, which fail
+        # with "table is locked" under concurrent clients instead of waiting.
+        for connection in connections.all():
+            if connection.vendor == 'sqlite' and not connection.settings_dict['TEST']['NAME']:
+                connection.settings_dict['TEST']['NAME'] = str(directory / f'{connection.alias}.sqlite3')
+
+    def run(self, options):
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            # Rate limits would turn most of the load into 429s.
+            rest_framework = {**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {}}
+            with override_settings(REST_FRAMEWORK=rest_framework):
+                results = {}
+                if not options['skip_load']:
+                    results['load'] = self.run_load(options)
+                if not options['skip_micro']:
+                    results['micro'] = self.run_micro()
+        finally:
+            last_login_buffer.flush()
+            outstanding_token_buffer.flush()
+            teardown_databases(old_config, verbosity=0)
+        return results
+
+    def report(self, results, options):
+        if options['save_baseline']:
+            save_baseline(options['baseline'], results)
+            self.stdout.write(f"Saved baseline to {options['baseline']}")
+            return
+
+        baseline = load_baseline(options['baseline'])
+        if baseline is None:
+            self.stdout.write(f"No baseline at {options['baseline']}, pass --save-baseline to create it.")
+            return
+        regressions = find_regressions(results, baseline, options['threshold'])
+        if regressions:
+            for regression in regressions:
+                self.stderr.write(regression)
+            raise CommandError(f"{len(regressions)} benchmarks regressed by more than {options['threshold']:.0%}.")
+        self.stdout.write(self.style.SUCCESS("No regressions against the baseline."))
+
+    def run_load(self, options):
+        from config.asgi import application as asgi_application
+        from config.wsgi import application as wsgi_application
+
+        runners = {
+            'wsgi': lambda path, payloads, scenario: run_wsgi_load(
+                wsgi_application, path, payloads, options['concurrency'], scenario.expected_status
+            ),
+            'asgi': lambda path, payloads, scenario: run_asgi_load(
+                asgi_application, path, payloads, options['concurrency'], scenario.expected_status
+            ),
+        }
+        results = {}
+        for name in options['scenarios'] or SCENARIOS:
+            scenario = SCENARIOS[name]
+            for interface in options['interfaces'] or INTERFACES:
+                # The ASGI app serves the async views where there are any.
+                path = scenario.async_path if interface == 'asgi' and scenario.async_path else scenario.path
+                payloads = scenario.prepare(options['requests'])
+                result = runners[interface](path, payloads, scenario)
+                last_login_buffer.flush()
+                outstanding_token_buffer.flush()
+
+                key = f'{interface}.{name}'
+                results[key] = result
+                self.stdout.write(
+                    f"{key:<16} p50 {result['p50']:8.2f}ms  p95 {result['p95']:8.2f}ms  "
+                    f"p99 {result['p99']:8.2f}ms  {result['throughput']:8.1f} req/s  "
+                    f"{result['errors']} errors"
+                )
+        return results
+
+    def run_micro(self):
+        results = run_micro()
+        for name, microseconds in results.items():
+            self.stdout.write(f"{name:<30} {microseconds:10.2f}us")
+        return results
+
+    def run_startup(self):
+        results = measure_startup()
+        for name, milliseconds in results.items():
+            self.stdout.write(f"startup {name:<22} {milliseconds:10.2f}ms")
+        return results
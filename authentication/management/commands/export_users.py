@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from authentication.export import FORMATS, export_users
+from authentication.serializers import UserExportSerializer
+
+
+class Command(BaseCommand):
+    help = "Stream the users to a file or stdout as CSV or NDJSON, in id order"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', dest='output', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--output-file', help="File to write to, defaults to stdout")
+        parser.add_argument('--country', help="Only users of this country")
+        parser.add_argument('--verified', dest='is_verified', action='store_true', default=None)
+        parser.add_argument('--unverified', dest='is_verified', action='store_false')
+        parser.add_argument('--created-after', help="Only users created at or after this ISO 8601 time")
+        parser.add_argument('--created-before', help="Only users created before this ISO 8601 time")
+        parser.add_argument(
+            '--after-id', dest='after', type=int, default=0,
+            help="Only users with a greater id, to resume a stopped export",
+        )
+        parser.add_argument('--batch-size', type=int, help="Rows per query, defaults to EXPORT_BATCH_SIZE")
+
+    def handle(self, *args, **options):
+        data = {
+            name: options[name]
+            for name in ('output', 'country', 'is_verified', 'created_after', 'created_before', 'after')
+            if options[name] is not None
+        }
+        serializer = UserExportSerializer(data=data)
+        if not serializer.is_valid():
+            raise CommandError('; '.join(
+                f"{field}: {' '.join(map(str, errors))}" for field, errors in serializer.errors.items()
+            ))
+
+        filters = dict(serializer.validated_data)
+        output_format = filters.pop('output')
+        after_id = filters.pop('after')
+        chunks = export_users(output_format, after_id=after_id, batch_size=options['batch_size'], **filters)
+
+        if options['output_file']:
+            with open(options['output_file'], 'w', encoding='utf-8', newline='') as output:
+                output.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
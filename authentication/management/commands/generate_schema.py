@@ -0,0 +1,37 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from authentication.conf import app_settings
+from config.schema import CODECS, generate_schema, schema_filename
+
+
+class Command(BaseCommand):
+    help = "Write the OpenAPI schema for every language to disk so it is served without generation"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output-dir',
+            help="Directory to write to, defaults to AUTHENTICATION['SCHEMA_DIR']",
+        )
+        parser.add_argument(
+            '--format',
+            choices=sorted(CODECS),
+            action='append',
+            dest='formats',
+            help="Format to write, may be repeated. Defaults to all formats.",
+        )
+
+    def handle(self, *args, **options):
+        output_dir = options['output_dir'] or app_settings.SCHEMA_DIR
+        if not output_dir:
+            raise CommandError("Pass --output-dir or set AUTHENTICATION['SCHEMA_DIR'].")
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        for language, _ in settings.LANGUAGES:
+            for fmt in options['formats'] or sorted(CODECS):
+                path = output_dir / schema_filename(language, fmt)
+                path.write_bytes(generate_schema(language, fmt))
+                self.stdout.write(f"Wrote {path}")
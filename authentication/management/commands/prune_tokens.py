@@ -0,0 +1,69 @@
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from authentication.tasks import prune_expired_tokens
+
+
+class Command(BaseCommand):
+    help = "Delete expired outstanding and blacklisted refresh tokens in batches by primary key range"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int,
+            help="Primary keys per delete, defaults to AUTHENTICATION['TOKEN_PRUNE_BATCH_SIZE']",
+        )
+        parser.add_argument(
+            '--sleep', type=float,
+            help="Seconds to pause between batches, defaults to AUTHENTICATION['TOKEN_PRUNE_SLEEP']",
+        )
+        parser.add_argument(
+            '--blacklisted-start-id', type=int, default=0,
+            help="Resume the blacklisted token pass from this id",
+        )
+        parser.add_argument(
+            '--outstanding-start-id', type=int, default=0,
+            help="Resume the outstanding token pass from this id",
+        )
+
+    def handle(self, *args, **options):
+        verbosity = options['verbosity']
+        resume_flags = {
+            BlacklistedToken._meta.db_table: 'blacklisted_start_id',
+            OutstandingToken._meta.db_table: 'outstanding_start_id',
+        }
+        resume = {flag: options[flag] for flag in resume_flags.values()}
+
+        def progress(table, next_id, deleted, elapsed):
+            resume[resume_flags[table]] = next_id
+            if verbosity > 1:
+                self.stdout.write(
+                    f"{table}: {deleted} deleted, next id {next_id}, {self.rate(deleted, elapsed)} rows/s"
+                )
+            elif verbosity:
+                self.stdout.write(f"{table}: next id {next_id}")
+
+        try:
+            results = prune_expired_tokens(
+                batch_size=options['batch_size'],
+                blacklisted_start_id=options['blacklisted_start_id'],
+                outstanding_start_id=options['outstanding_start_id'],
+                sleep=options['sleep'],
+                progress=progress,
+            )
+        except KeyboardInterrupt:
+            # Written to stderr whatever the verbosity, a stopped run is
+            # only cheap to restart with these.
+            raise CommandError(
+                "Interrupted, resume with " + " ".join(
+                    f"--{flag.replace('_', '-')} {start_id}" for flag, start_id in resume.items()
+                )
+            ) from None
+        for table, result in results.items():
+            self.stdout.write(
+                f"{table}: {result['deleted']} expired rows deleted in {result['seconds']:.1f}s, "
+                f"{self.rate(result['deleted'], result['seconds'])} rows/s"
+            )
+
+    @staticmethod
+    def rate(rows, elapsed):
+        return f"{rows / elapsed:.0f}" if elapsed else "-"
@@ -1,4 +1,44 @@
+import re
+
 from django.contrib.auth.models import BaseUserManager
+from django.db.models import Q
+
+from authentication.phone import digits, normalize
+
+PARTIAL_NUMBER_RE = re.compile(r'^\+?[\d\s\-()]+$')
+
+
+def prefix_range_q(field, prefix):
+    """
+    Q for values of field starting with a string of digits, as a range
+    [prefix, next prefix) that an index on field can answer; startswith
+    compiles to LIKE, which SQLite doesn't answer from an index.
+    """
+    q = Q(**{f'{field}__gte': prefix})
+    # The next prefix: drop trailing nines and increment the last digit,
+    # '1299' -> '13'. An all-nines prefix has no upper bound.
+    head = prefix.rstrip('9')
+    if head:
+        q &= Q(**{f'{field}__lt': head[:-1] + str(int(head[-1]) + 1)})
+    return q
+
+
+def phone_search_q(term):
+    """
+    Q for numbers starting or ending with the digits of a partial number,
+    answered from the indexes on phone_digits and phone_digits_reversed.
+    None when term doesn't look like a number.
+    """
+    term = term.strip()
+    if not PARTIAL_NUMBER_RE.match(term):
+        return None
+    term_digits = digits(term)
+    if not term_digits:
+        return None
+    q = prefix_range_q('phone_digits', term_digits)
+    if not term.startswith('+'):
+        q |= prefix_range_q('phone_digits_reversed', term_digits[::-1])
+    return q
 
 
 class UserManager(BaseUserManager):
@@ -27,8 +67,10 @@ class UserManager(BaseUserManager):
         return self.create_user(phone_number, password, **extra_fields)
 
     def normalize_phone_number(self, phone_number):
-        if phone_number:
-            phone_number = phone_number.replace(' ', '').replace('-', '')
-            if not phone_number.startswith('+'):
-                phone_number = '+' + phone_number
-        return phone_number
+        return normalize(phone_number)
+
+    def search_phone(self, term):
+        q = phone_search_q(term)
+        if q is None:
+            return self.none()
+        return self.filter(q)
@@ -0,0 +1,204 @@
+"""
+Per-request phase timings and Prometheus histograms.
+
+ServerTimingMiddleware starts a RequestTimings for every request. Code
+wrapped in timed(phase) and every ORM query add to it, and at the end of
+the request the phases are observed in the histograms served by
+metrics_view, and sent as a Server-Timing header if SERVER_TIMING_HEADER
+is on. Outside of a request, timed() does
+nothing but call through.
+
+Histograms are per process; with several workers, scrape each of them or
+sum on the Prometheus side.
+"""
+import bisect
+import functools
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction
+from django.http import Http404, HttpResponse
+from rest_framework.settings import api_settings
+
+from authentication.conf import app_settings
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+
+_current = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """Accumulated seconds and counts per phase for one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.queries = 0
+
+    def add(self, phase, seconds):
+        total, count = self.phases.get(phase, (0.0, 0))
+        self.phases[phase] = (total + seconds, count + 1)
+
+    def server_timing(self, total):
+        entries = []
+        for phase, (seconds, count) in self.phases.items():
+            entry = f'{phase};dur={seconds * 1000:.2f}'
+            if phase == 'db':
+                entry += f';desc="{count} queries"'
+            entries.append(entry)
+        entries.append(f'total;dur={total * 1000:.2f}')
+        return ', '.join(entries)
+
+
+def start_request():
+    """Install a RequestTimings for the current context, returns (timings, reset token)"""
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def timed(phase):
+    """Decorator adding the duration of each call to the request's phase"""
+    def decorator(func):
+        if iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                timings = _current.get()
+                if timings is None:
+                    return await func(*args, **kwargs)
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    timings.add(phase, time.perf_counter() - started)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            timings = _current.get()
+            if timings is None:
+                return func(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timings.add(phase, time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def time_query(execute, sql, params, many, context):
+    """Database execute wrapper, installed on every connection as it opens"""
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add('db', time.perf_counter() - started)
+        timings.queries += 1
+
+
+class Histogram:
+    """
+    Thread-safe Prometheus histogram with fixed buckets and labels.
+    """
+
+    def __init__(self, name, documentation, labelnames, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Bucket counts, then sum and count.
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def _labels(self, labels, **extra):
+        pairs = [*zip(self.labelnames, labels), *extra.items()]
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        for labels, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), values):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{self._labels(labels, le=bound)} {cumulative}')
+            lines.append(f'{self.name}_sum{self._labels(labels)} {values[-2]}')
+            lines.append(f'{self.name}_count{self._labels(labels)} {values[-1]}')
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+request_duration = Histogram(
+    'http_request_duration_seconds', 'Request duration by view, method and status.',
+    ('view', 'method', 'status'), LATENCY_BUCKETS,
+)
+phase_duration = Histogram(
+    'http_request_phase_seconds', 'Time spent per request in each phase.',
+    ('view', 'phase'), LATENCY_BUCKETS,
+)
+request_queries = Histogram(
+    'http_request_db_queries', 'Database queries per request.',
+    ('view',), QUERY_BUCKETS,
+)
+HISTOGRAMS = (request_duration, phase_duration, request_queries)
+
+
+def observe_request(request, response, timings, total):
+    match = getattr(request, 'resolver_match', None)
+    view = match.view_name if match is not None and match.view_name else 'unmatched'
+    request_duration.observe(total, view, request.method, response.status_code)
+    for phase, (seconds, _) in timings.phases.items():
+        phase_duration.observe(seconds, view, phase)
+    request_queries.observe(timings.queries, view)
+
+
+def client_ip(request):
+    """
+    The client address, read from X-Forwarded-For past the
+    REST_FRAMEWORK['NUM_PROXIES'] trusted proxies the way DRF throttles
+    do. Without NUM_PROXIES the header is ignored, anyone can send it.
+    """
+    num_proxies = api_settings.NUM_PROXIES
+    forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+    if num_proxies and forwarded_for:
+        addresses = [address.strip() for address in forwarded_for.split(',')]
+        return addresses[-min(num_proxies, len(addresses))]
+    return request.META.get('REMOTE_ADDR')
+
+
+def metrics_view(request):
+    """Prometheus text exposition of this process' histograms"""
+    if app_settings.METRICS_ALLOWED_IPS is not None and (
+        client_ip(request) not in app_settings.METRICS_ALLOWED_IPS
+    ):
+        raise Http404
+    lines = [line for histogram in HISTOGRAMS for line in histogram.render()]
+    return HttpResponse(
+        '\n'.join(lines) + '\n',
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
@@ -0,0 +1,169 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.messages.middleware import MessageMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.middleware.clickjacking import XFrameOptionsMiddleware
+from django.middleware.csrf import CsrfViewMiddleware
+
+from authentication.conf import app_settings
+from authentication.metrics import end_request, observe_request, start_request
+from authentication.routers import new_state, reset_state, use_state
+
+
+class ReplicaPinningMiddleware:
+    """
+    Gives every request its own ReplicaRouter state. Requests that wrote
+    set a cookie that pins the client's reads to the primary for
+    REPLICA_LAG_TOLERANCE seconds, so it reads its own writes even while
+    the replicas lag behind.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _begin(self, request):
+        state = new_state(pinned=app_settings.REPLICA_PIN_COOKIE in request.COOKIES)
+        return state, use_state(state)
+
+    def _finish(self, state, response):
+        lag_tolerance = app_settings.REPLICA_LAG_TOLERANCE
+        if state['wrote'] and lag_tolerance:
+            response.set_cookie(
+                app_settings.REPLICA_PIN_COOKIE, '1',
+                max_age=lag_tolerance, httponly=True, samesite='Lax',
+            )
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state, token = self._begin(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            reset_state(token)
+        return self._finish(state, response)
+
+    async def __acall__(self, request):
+        state, token = self._begin(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            reset_state(token)
+        return self._finish(state, response)
+
+
+class ServerTimingMiddleware:
+    """
+    Times every request by phase, see authentication.metrics. Adds a
+    Server-Timing header when SERVER_TIMING_HEADER is on and records the
+    timings in the /metrics histograms.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _finish(self, request, response, timings):
+        total = time.perf_counter() - timings.started
+        if app_settings.SERVER_TIMING_HEADER:
+            response['Server-Timing'] = timings.server_timing(total)
+        observe_request(request, response, timings, total)
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not app_settings.METRICS_ENABLED:
+            return self.get_response(request)
+        timings, token = start_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            end_request(token)
+        return self._finish(request, response, timings)
+
+    async def __acall__(self, request):
+        if not app_settings.METRICS_ENABLED:
+            return await self.get_response(request)
+        timings, token = start_request()
+        try:
+            response = await self.get_response(request)
+        finally:
+            end_request(token)
+        return self._finish(request, response, timings)
+
+
+def _strip_language(path):
+    # i18n_patterns put the language code in front of the route.
+    language, separator, rest = path[1:].partition('/')
+    if separator and any(language == code for code, _ in settings.LANGUAGES):
+        return '/' + rest
+    return path
+
+
+def skipped_middleware(request):
+    """
+    Dotted paths of the middleware left out by the MIDDLEWARE_PROFILES
+    entry whose prefix matches the request path, with or without a
+    language prefix.
+    """
+    skipped = getattr(request, '_skipped_middleware', None)
+    if skipped is None:
+        skipped = frozenset()
+        path = request.path_info
+        route = _strip_language(path)
+        for prefix, middleware in app_settings.MIDDLEWARE_PROFILES.items():
+            if path.startswith(prefix) or route.startswith(prefix):
+                skipped = frozenset(middleware)
+                break
+        request._skipped_middleware = skipped
+    return skipped
+
+
+class RouteProfileMixin:
+    """
+    Passes requests straight through when skipped_middleware() lists
+    skip_name, the dotted path of the middleware this is mixed into.
+    """
+    skip_name = None
+
+    def __call__(self, request):
+        if self.skip_name in skipped_middleware(request):
+            return self.get_response(request)
+        return super().__call__(request)
+
+
+class ProfiledSessionMiddleware(RouteProfileMixin, SessionMiddleware):
+    skip_name = 'django.contrib.sessions.middleware.SessionMiddleware'
+
+
+class ProfiledCsrfViewMiddleware(RouteProfileMixin, CsrfViewMiddleware):
+    skip_name = 'django.middleware.csrf.CsrfViewMiddleware'
+
+    def process_view(self, request, callback, callback_args, callback_kwargs):
+        if self.skip_name in skipped_middleware(request):
+            return None
+        return super().process_view(request, callback, callback_args, callback_kwargs)
+
+
+class ProfiledAuthenticationMiddleware(RouteProfileMixin, AuthenticationMiddleware):
+    skip_name = 'django.contrib.auth.middleware.AuthenticationMiddleware'
+
+
+class ProfiledMessageMiddleware(RouteProfileMixin, MessageMiddleware):
+    skip_name = 'django.contrib.messages.middleware.MessageMiddleware'
+
+
+class ProfiledXFrameOptionsMiddleware(RouteProfileMixin, XFrameOptionsMiddleware):
+    skip_name = 'django.middleware.clickjacking.XFrameOptionsMiddleware'
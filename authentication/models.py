@@ -1,13 +1,11 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from authentication.hashing import hash_password
 from authentication.managers import UserManager
-from authentication.utils import validate_phone_number
+from authentication.phone import COUNTRIES, digits
+from authentication.utils import get_country_from_phone, validate_phone_number
 
-COUNTRY_CHOICES = [
-    ('Uzbekistan', 'Uzbekistan'),
-    ('Russia', 'Russia'),
-    ('USA', 'USA'),
-]
+COUNTRY_CHOICES = [(country.name, country.name) for country in COUNTRIES]
 
 
 class TimeStampedModel(models.Model):
@@ -31,6 +29,11 @@ class UserModel(AbstractUser, TimeStampedModel):
         default='Uzbekistan',
     )
     is_verified = models.BooleanField(default=False)
+    # Digits of phone_number as stored and reversed, for prefix and
+    # suffix searches. Kept in sync by save(); bulk paths call
+    # set_phone_digits() themselves.
+    phone_digits = models.CharField(max_length=30, blank=True, default='', editable=False)
+    phone_digits_reversed = models.CharField(max_length=30, blank=True, default='', editable=False)
 
     USERNAME_FIELD = 'phone_number'
     REQUIRED_FIELDS = ['country']
@@ -39,12 +42,23 @@ class UserModel(AbstractUser, TimeStampedModel):
 
     def clean(self):
         super().clean()
-        if self.phone_number.startswith('+998'):
-            self.country = 'Uzbekistan'
-        elif self.phone_number.startswith('+7'):
-            self.country = 'Russia'
-        elif self.phone_number.startswith('+1'):
-            self.country = 'USA'
+        self.country = get_country_from_phone(self.phone_number) or self.country
+
+    def set_password(self, raw_password):
+        # Hashed on the password pool instead of the request thread.
+        self.password = hash_password(raw_password)
+        self._password = raw_password
+
+    def set_phone_digits(self):
+        self.phone_digits = digits(self.phone_number)
+        self.phone_digits_reversed = self.phone_digits[::-1]
+
+    def save(self, *args, **kwargs):
+        self.set_phone_digits()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'phone_number' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'phone_digits', 'phone_digits_reversed'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.phone_number} ({self.country})"
@@ -53,3 +67,29 @@ class UserModel(AbstractUser, TimeStampedModel):
         verbose_name = 'User'
         verbose_name_plural = 'Users'
         db_table = 'user'
+        # The admin changelist orders by (-created_at, -id) and pages by
+        # keyset on those columns, alone or under its list_filter choices.
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='user_created_id_idx'),
+            models.Index(fields=['country', '-created_at', '-id'], name='user_country_created_idx'),
+            models.Index(
+                fields=['is_verified', 'country', '-created_at', '-id'],
+                name='user_verified_created_idx',
+            ),
+            # Staff and deactivated accounts are a small fraction of the
+            # table, partial indexes keep those filters cheap.
+            models.Index(
+                fields=['-created_at', '-id'],
+                condition=models.Q(is_staff=True),
+                name='user_staff_created_idx',
+            ),
+            models.Index(
+                fields=['-created_at', '-id'],
+                condition=models.Q(is_active=False),
+                name='user_inactive_created_idx',
+            ),
+            # Prefix searches are range lookups (see phone_search_q), which
+            # a plain b-tree answers on SQLite and PostgreSQL alike.
+            models.Index(fields=['phone_digits'], name='user_phone_digits_idx'),
+            models.Index(fields=['phone_digits_reversed'], name='user_phone_digits_rev_idx'),
+        ]
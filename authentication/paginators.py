@@ -0,0 +1,90 @@
+import json
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+from authentication.conf import app_settings
+
+
+def estimate_count(queryset):
+    """The planner's row estimate for a queryset on PostgreSQL, None elsewhere"""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.query.get_compiler(queryset.db).as_sql()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def encode_cursor(obj):
+    return f'{obj.created_at.isoformat()}_{obj.pk}'
+
+
+def decode_cursor(value):
+    """Parse a cursor into (created_at, pk), None when it is malformed"""
+    created_at, _, pk = value.rpartition('_')
+    try:
+        created_at = parse_datetime(created_at)
+        pk = int(pk)
+    except ValueError:
+        return None
+    if created_at is None:
+        return None
+    return created_at, pk
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Counts exactly up to ADMIN_EXACT_COUNT_LIMIT rows with a LIMITed
+    COUNT, and returns the database's estimate above that instead of
+    scanning the whole table.
+    """
+    estimated = False
+
+    @cached_property
+    def count(self):
+        limit = app_settings.ADMIN_EXACT_COUNT_LIMIT
+        queryset = self.object_list.order_by()
+        counted = queryset[:limit + 1].count()
+        if counted <= limit:
+            return counted
+        estimate = estimate_count(queryset)
+        if estimate is None:
+            return queryset.count()
+        self.estimated = True
+        return max(estimate, counted)
+
+
+class KeysetPaginator(EstimatedCountPaginator):
+    """
+    Pages through a queryset ordered by ('-created_at', '-id'). Given a
+    cursor, page() returns the rows after it using the index on those
+    columns instead of an OFFSET scan.
+    """
+
+    def __init__(self, object_list, per_page, orphans=0, allow_empty_first_page=True, cursor=None):
+        super().__init__(object_list, per_page, orphans, allow_empty_first_page)
+        self.cursor = cursor
+
+    def page(self, number):
+        if self.cursor is None:
+            return super().page(number)
+        created_at, pk = self.cursor
+        rows = self.object_list.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk)
+        )
+        return self._get_page(list(rows[:self.per_page]), 1, self)
+
+    def next_cursor(self, rows):
+        """Cursor for the page following rows, None on the last page"""
+        rows = list(rows)
+        if len(rows) < self.per_page:
+            return None
+        return encode_cursor(rows[-1])
@@ -0,0 +1,98 @@
+"""
+Country registry and phone number classification.
+
+COUNTRIES is the single source of truth for supported calling codes. At
+import it is compiled into a trie keyed by the digits of the dial code,
+so classifying a number is one walk over at most MAX_DIAL_CODE_LENGTH
+characters plus a length check, whatever the number of countries.
+"""
+from collections import namedtuple
+
+Country = namedtuple('Country', ['name', 'dial_code', 'national_lengths', 'example'])
+
+COUNTRIES = (
+    Country('Uzbekistan', '998', (9,), '+998901234567'),
+    Country('Russia', '7', (10,), '+79123456789'),
+    Country('USA', '1', (10,), '+11234567890'),
+)
+
+_COUNTRY = object()
+_ASCII_DIGITS = frozenset('0123456789')
+
+
+def _compile(countries):
+    trie = {}
+    for country in countries:
+        node = trie
+        for digit in country.dial_code:
+            node = node.setdefault(digit, {})
+        if _COUNTRY in node:
+            raise ValueError(f'Duplicate dial code +{country.dial_code}')
+        node[_COUNTRY] = country
+    return trie
+
+
+_TRIE = _compile(COUNTRIES)
+MAX_DIAL_CODE_LENGTH = max(len(country.dial_code) for country in COUNTRIES)
+
+
+def _prefix_matches(phone_number):
+    """Countries whose dial code prefixes the number, longest code first"""
+    matches = []
+    if not phone_number or phone_number[0] != '+':
+        return matches
+    node = _TRIE
+    for digit in phone_number[1:MAX_DIAL_CODE_LENGTH + 1]:
+        node = node.get(digit)
+        if node is None:
+            break
+        country = node.get(_COUNTRY)
+        if country is not None:
+            matches.append(country)
+    matches.reverse()
+    return matches
+
+
+def classify(phone_number):
+    """
+    Return the Country of a valid E.164 number, or None when the number
+    does not match any registered dial code and length.
+    """
+    for country in _prefix_matches(phone_number):
+        national = phone_number[len(country.dial_code) + 1:]
+        if len(national) in country.national_lengths and _ASCII_DIGITS.issuperset(national):
+            return country
+    return None
+
+
+def classify_many(phone_numbers):
+    """Classify an iterable of numbers, yielding a Country or None for each"""
+    for phone_number in phone_numbers:
+        yield classify(phone_number)
+
+
+def country_for_prefix(phone_number):
+    """Return the Country whose dial code is the longest prefix of the number"""
+    matches = _prefix_matches(phone_number)
+    return matches[0] if matches else None
+
+
+def normalize(phone_number):
+    """Strip spaces and dashes and make sure the number starts with +"""
+    if phone_number:
+        phone_number = phone_number.replace(' ', '').replace('-', '')
+        if not phone_number.startswith('+'):
+            phone_number = '+' + phone_number
+    return phone_number
+
+
+def digits(phone_number):
+    """Only the ASCII digits of a number, e.g. for indexed partial searches"""
+    if not phone_number:
+        return ''
+    return ''.join(char for char in phone_number if char in _ASCII_DIGITS)
+
+
+INVALID_FORMAT_MESSAGE = "Invalid phone number format. Valid formats: " + ", ".join(
+    f"{country.name}: {country.example}" for country in COUNTRIES
+)
@@ -0,0 +1,56 @@
+from authentication.bloomsync import PolledBloomFilter
+
+
+class PhoneRegistry(PolledBloomFilter):
+    """
+    Per-process answer to "is this phone number registered?".
+
+    A bloom filter of every normalized UserModel.phone_number answers
+    "not registered" from memory. Possible hits are confirmed with a
+    lookup on the unique phone_number index. New users are added through
+    post_save for this process and by polling, at most every
+    PHONE_REGISTRY_SYNC_INTERVAL seconds, for other processes. The server
+    entry points build the filter at startup, see prepare_server().
+
+    Deleted numbers can't be removed from a bloom filter; they only cost a
+    database check until enough have piled up to trigger a rebuild.
+    """
+    value_field = 'phone_number'
+    capacity_setting = 'PHONE_BLOOM_CAPACITY'
+    error_rate_setting = 'PHONE_BLOOM_ERROR_RATE'
+    sync_interval_setting = 'PHONE_REGISTRY_SYNC_INTERVAL'
+    rescan_window_setting = 'PHONE_REGISTRY_RESCAN_WINDOW'
+
+    def __init__(self):
+        super().__init__()
+        self._deleted = 0
+
+    def get_queryset(self):
+        from authentication.models import UserModel
+
+        return UserModel.objects.all()
+
+    def needs_rebuild(self, bloom):
+        # Many deleted numbers degrade the error rate as well.
+        return super().needs_rebuild(bloom) or self._deleted * 10 > len(bloom)
+
+    def _load(self):
+        self._deleted = 0
+        super()._load()
+
+    def is_registered(self, phone_number):
+        """phone_number must be normalized"""
+        return self.contains(phone_number)
+
+    def discard(self, phone_number):
+        """Note a number deleted by this process"""
+        if self._state is None:
+            return
+        with self._lock:
+            self._deleted += 1
+
+    def stats(self):
+        return {**super().stats(), 'deleted': self._deleted}
+
+
+phone_registry = PhoneRegistry()
@@ -0,0 +1,108 @@
+"""
+Fast serialization for the hot login and register responses.
+
+CompiledRepresentation turns a serializer class into a flat list of
+(field name, attribute, converter) steps the first time it is used, then
+builds the same dict as serializer_class(instance).data without creating
+a serializer or its fields per call. render_json() produces the same
+bytes as DRF's JSONRenderer.
+"""
+import json
+
+from django.http import HttpResponse
+from rest_framework import ISO_8601, fields
+from rest_framework.settings import api_settings
+from rest_framework.utils import encoders
+
+from authentication.metrics import timed
+from authentication.serializers import RegisterSerializer, UserProfileSerializer
+
+SHORT_SEPARATORS = (',', ':')
+LONG_SEPARATORS = (', ', ': ')
+
+
+def _datetime_converter(field):
+    def convert(value):
+        value = field.enforce_timezone(value).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    return convert
+
+
+def _converter_for(field):
+    field_type = type(field)
+    if field_type is fields.IntegerField:
+        return int
+    if field_type is fields.CharField:
+        return str
+    if field_type is fields.BooleanField:
+        return bool
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if (
+        field_type is fields.DateTimeField
+        and isinstance(output_format, str)
+        and output_format.lower() == ISO_8601
+    ):
+        return _datetime_converter(field)
+    return field.to_representation
+
+
+class CompiledRepresentation:
+    """
+    Callable returning serializer_class(instance).data for an instance.
+    """
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self._steps = None
+
+    def _compile(self):
+        steps = []
+        for field in self.serializer_class()._readable_fields:
+            if len(field.source_attrs) == 1:
+                steps.append((field.field_name, field.source_attrs[0], _converter_for(field), None))
+            else:
+                steps.append((field.field_name, None, field.to_representation, field))
+        return steps
+
+    def prepare(self):
+        """Compile the steps now instead of on the first call"""
+        if self._steps is None:
+            self._steps = self._compile()
+        return self._steps
+
+    @timed('serialize')
+    def __call__(self, instance):
+        steps = self._steps
+        if steps is None:
+            steps = self.prepare()
+
+        data = {}
+        for name, attribute, convert, field in steps:
+            if field is None:
+                value = getattr(instance, attribute)
+            else:
+                value = field.get_attribute(instance)
+            data[name] = None if value is None else convert(value)
+        return data
+
+
+def render_json(data):
+    """Encode data exactly like DRF's JSONRenderer with default settings"""
+    ret = json.dumps(
+        data, cls=encoders.JSONEncoder,
+        ensure_ascii=not api_settings.UNICODE_JSON,
+        allow_nan=not api_settings.STRICT_JSON,
+        separators=SHORT_SEPARATORS if api_settings.COMPACT_JSON else LONG_SEPARATORS,
+    )
+    ret = ret.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029')
+    return ret.encode()
+
+
+def json_response(data, status=200):
+    return HttpResponse(render_json(data), content_type='application/json', status=status)
+
+
+user_profile = CompiledRepresentation(UserProfileSerializer)
+registered_user = CompiledRepresentation(RegisterSerializer)
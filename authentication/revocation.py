@@ -0,0 +1,35 @@
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from authentication.bloomsync import PolledBloomFilter
+from authentication.conf import app_settings
+from authentication.datastructures import LRUCache
+
+
+class RevocationCache(PolledBloomFilter):
+    """
+    Per-process answer to "is this refresh token blacklisted?".
+
+    A bloom filter of every blacklisted JTI answers most "not revoked"
+    checks from memory. Bloom hits are confirmed against the database and
+    the confirmed JTIs are kept in an LRU. New blacklist rows are picked up
+    through the post_save signal for this process and by polling, at most
+    every REVOCATION_SYNC_INTERVAL seconds, for rows written by other
+    processes.
+    """
+    value_field = 'token__jti'
+    capacity_setting = 'REVOCATION_BLOOM_CAPACITY'
+    error_rate_setting = 'REVOCATION_BLOOM_ERROR_RATE'
+    sync_interval_setting = 'REVOCATION_SYNC_INTERVAL'
+    rescan_window_setting = 'REVOCATION_RESCAN_WINDOW'
+
+    def get_queryset(self):
+        return BlacklistedToken.objects.all()
+
+    def new_cache(self):
+        return LRUCache(app_settings.REVOCATION_LRU_SIZE)
+
+    def is_revoked(self, jti):
+        return self.contains(jti)
+
+
+revocation_cache = RevocationCache()
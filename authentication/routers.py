@@ -0,0 +1,93 @@
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from django.db import connections
+
+from authentication.conf import app_settings
+
+# Per-request routing state, installed by ReplicaPinningMiddleware.
+_request_state = ContextVar('replica_routing_state', default=None)
+_thread_state = threading.local()
+
+
+def new_state(pinned=False):
+    return {'pinned': pinned, 'wrote': False, 'wrote_at': None}
+
+
+def get_state():
+    state = _request_state.get()
+    if state is None:
+        # Outside of a request, e.g. management commands or background
+        # threads, a write pins the thread's reads for
+        # REPLICA_LAG_TOLERANCE seconds.
+        state = getattr(_thread_state, 'state', None)
+        if state is None or (
+            state['wrote_at'] is not None
+            and time.monotonic() - state['wrote_at'] >= app_settings.REPLICA_LAG_TOLERANCE
+        ):
+            state = _thread_state.state = new_state()
+    return state
+
+
+def reset_thread_state():
+    """Forget the calling thread's pin"""
+    _thread_state.__dict__.pop('state', None)
+
+
+def use_state(state):
+    """Install a routing state for the current context, returns a reset token"""
+    return _request_state.set(state)
+
+
+def reset_state(token):
+    _request_state.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Sends reads of the user and simplejwt token tables to a replica from
+    AUTHENTICATION['DATABASE_REPLICAS'] and every write to the primary.
+
+    Once a request has written, its remaining reads go to the primary so
+    it sees its own writes. ReplicaPinningMiddleware extends that pin to
+    the client's following requests for REPLICA_LAG_TOLERANCE seconds.
+
+    Blacklist and outstanding token reads always go to the primary: a
+    lagging replica would let a token that was just revoked through.
+    """
+    route_app_labels = {'authentication', 'token_blacklist'}
+    primary_only_app_labels = {'token_blacklist'}
+    primary = 'default'
+
+    def _replicas(self):
+        return [alias for alias in app_settings.DATABASE_REPLICAS if alias in connections.databases]
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label not in self.route_app_labels:
+            return None
+        if model._meta.app_label in self.primary_only_app_labels:
+            return self.primary
+        replicas = self._replicas()
+        if not replicas or get_state()['pinned']:
+            return self.primary
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label not in self.route_app_labels:
+            return None
+        state = get_state()
+        state['pinned'] = True
+        state['wrote'] = True
+        state['wrote_at'] = time.monotonic()
+        return self.primary
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {self.primary, *self._replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
@@ -0,0 +1,587 @@
+"""
+OpenAPI declarations for the authentication views.
+
+drf_yasg and the openapi trees below are only needed to generate the
+docs, so views declare their overrides with lazy_swagger_auto_schema().
+Each declaration is a function of the drf_yasg.openapi module, called the
+first time the schema generator reads it; workers that never build the
+schema never import drf_yasg for it.
+"""
+import copy
+from collections.abc import Mapping
+
+from authentication.models import COUNTRY_CHOICES
+from authentication.phone import INVALID_FORMAT_MESSAGE
+
+
+class LazyOverrides(Mapping):
+    """
+    Stands in for the _swagger_auto_schema dict that swagger_auto_schema()
+    sets on a view method, built from factory(openapi) on first access.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self._data = None
+
+    def _materialize(self):
+        if self._data is None:
+            from drf_yasg import openapi
+            from drf_yasg.utils import swagger_auto_schema
+
+            # Let swagger_auto_schema validate and normalize the arguments
+            # exactly as if it decorated the view method.
+            def target():
+                pass
+            swagger_auto_schema(**self.factory(openapi))(target)
+            self._data = target._swagger_auto_schema
+        return self._data
+
+    def __getitem__(self, key):
+        return self._materialize()[key]
+
+    def __iter__(self):
+        return iter(self._materialize())
+
+    def __len__(self):
+        return len(self._materialize())
+
+    def __deepcopy__(self, memo):
+        # drf_yasg deep-copies the overrides of every operation.
+        return copy.deepcopy(self._materialize(), memo)
+
+
+def lazy_swagger_auto_schema(factory):
+    """swagger_auto_schema(**factory(openapi)), evaluated when the docs are generated"""
+    def decorator(view_method):
+        view_method._swagger_auto_schema = LazyOverrides(factory)
+        return view_method
+    return decorator
+
+
+def register_operation(openapi):
+    return dict(
+        operation_summary="Register User",
+        operation_description="Register a new user with phone number, password, and country using form data. The country field is a dropdown based on predefined choices.",
+        manual_parameters=[
+            openapi.Parameter(
+                name='phone_number',
+                in_=openapi.IN_FORM,
+                type=openapi.TYPE_STRING,
+                required=True,
+                description="User's phone number (e.g., +998901234567)",
+                max_length=30,
+                example="+998901234567"
+            ),
+            openapi.Parameter(
+                name='password',
+                in_=openapi.IN_FORM,
+                type=openapi.TYPE_STRING,
+                required=True,
+                description="Password (minimum 8 characters, must include at least one uppercase letter)",
+                min_length=8,
+                format='password'
+            ),
+            openapi.Parameter(
+                name='password_confirm',
+                in_=openapi.IN_FORM,
+                type=openapi.TYPE_STRING,
+                required=True,
+                description="Must match the password field",
+                format='password'
+            ),
+            openapi.Parameter(
+                name='country',
+                in_=openapi.IN_FORM,
+                type=openapi.TYPE_STRING,
+                required=True,
+                description="User's country (select from dropdown)",
+                enum=[choice[0] for choice in COUNTRY_CHOICES],
+                default="Uzbekistan",
+                example="Uzbekistan"
+            ),
+        ],
+        consumes=['multipart/form-data', 'application/x-www-form-urlencoded'],
+        responses={
+            201: openapi.Response(
+                description="User registered successfully",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'message': openapi.Schema(type=openapi.TYPE_STRING, example="User registered successfully"),
+                        'user_info': openapi.Schema(
+                            type=openapi.TYPE_OBJECT,
+                            properties={
+                                'phone_number': openapi.Schema(type=openapi.TYPE_STRING, example="+998901234567"),
+                                'country': openapi.Schema(
+                                    type=openapi.TYPE_STRING,
+                                    enum=[choice[0] for choice in COUNTRY_CHOICES],
+                                    example="Uzbekistan"
+                                ),
+                            }
+                        )
+                    }
+                ),
+                examples={
+                    "application/json": {
+                        "message": "User registered successfully",
+                        "user_info": {
+                            "phone_number": "+998901234567",
+                            "country": "Uzbekistan"
+                        }
+                    }
+                }
+            ),
+            400: openapi.Response(
+                description="Bad Request",
+                examples={
+                    "application/json": {
+                        "phone_number": ["This field is required."],
+                        "password": ["Password must be at least 8 characters."],
+                        "password_confirm": ["Passwords do not match."],
+                        "country": ["Invalid choice."]
+                    }
+                }
+            )
+        },
+        tags=['Authentication'],
+    )
+
+
+def batch_register_operation(openapi):
+    return dict(
+        operation_summary="Batch Register Users",
+        operation_description="Register many users at once. Accepts a JSON array or an NDJSON stream (application/x-ndjson) of objects with phone_number, password and country. Every row is validated with the registration rules and gets its own result.",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_ARRAY,
+            items=openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                required=['phone_number', 'password'],
+                properties={
+                    'phone_number': openapi.Schema(type=openapi.TYPE_STRING, example="+998901234567"),
+                    'password': openapi.Schema(type=openapi.TYPE_STRING, format='password'),
+                    'country': openapi.Schema(
+                        type=openapi.TYPE_STRING,
+                        enum=[choice[0] for choice in COUNTRY_CHOICES],
+                        example="Uzbekistan"
+                    ),
+                }
+            )
+        ),
+        responses={
+            200: openapi.Response(
+                description="Batch processed, see per-row results",
+                examples={
+                    "application/json": {
+                        "created": 1,
+                        "failed": 1,
+                        "results": [
+                            {
+                                "index": 0,
+                                "status": "created",
+                                "id": 1,
+                                "phone_number": "+998901234567",
+                                "country": "Uzbekistan"
+                            },
+                            {
+                                "index": 1,
+                                "status": "error",
+                                "errors": {"phone_number": ["User with this phone number already exists."]}
+                            }
+                        ]
+                    }
+                }
+            ),
+            400: openapi.Response(
+                description="Bad Request",
+                examples={
+                    "application/json": {
+                        "detail": ["Expected a list of users."]
+                    }
+                }
+            )
+        },
+        tags=['Authentication'],
+    )
+
+
+def user_export_operation(openapi):
+    return dict(
+        operation_summary="Export Users",
+        operation_description="Stream the users matching the filters as CSV or NDJSON, in id order. Staff only. Memory use does not depend on the number of rows; to resume a stopped export, pass the last exported id as after.",
+        manual_parameters=[
+            openapi.Parameter(
+                name='output',
+                in_=openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                enum=['csv', 'ndjson'],
+                default='csv',
+                description="Export format"
+            ),
+            openapi.Parameter(
+                name='country',
+                in_=openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                enum=[choice[0] for choice in COUNTRY_CHOICES],
+                description="Only users of this country"
+            ),
+            openapi.Parameter(
+                name='is_verified',
+                in_=openapi.IN_QUERY,
+                type=openapi.TYPE_BOOLEAN,
+                description="Only verified or only unverified users"
+            ),
+            openapi.Parameter(
+                name='created_after',
+                in_=openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                format=openapi.FORMAT_DATETIME,
+                description="Only users created at or after this time"
+            ),
+            openapi.Parameter(
+                name='created_before',
+                in_=openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                format=openapi.FORMAT_DATETIME,
+                description="Only users created before this time"
+            ),
+            openapi.Parameter(
+                name='after',
+                in_=openapi.IN_QUERY,
+                type=openapi.TYPE_INTEGER,
+                default=0,
+                description="Only users with a greater id, to resume an export"
+            ),
+        ],
+        responses={
+            200: openapi.Response(
+                description="The export, streamed",
+                examples={
+                    "text/csv": "id,phone_number,country,is_verified,is_active,date_joined,last_login,created_at,updated_at\n"
+                                "1,+998901234567,Uzbekistan,True,True,2025-01-02T03:04:05+00:00,,2025-01-02T03:04:05+00:00,2025-01-02T03:04:05+00:00\n"
+                }
+            ),
+            400: openapi.Response(
+                description="Bad Request",
+                examples={
+                    "application/json": {
+                        "output": ["\"xml\" is not a valid choice."]
+                    }
+                }
+            )
+        },
+        tags=['Authentication'],
+    )
+
+
+def phone_availability_operation(openapi):
+    return dict(
+        operation_summary="Check Phone Number Availability",
+        operation_description="Check whether a phone number can still be used to register. Meant for signup forms checking as the user types.",
+        manual_parameters=[
+            openapi.Parameter(
+                name='phone_number',
+                in_=openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                required=True,
+                description="Phone number to check (e.g., +998901234567)",
+                example="+998901234567"
+            ),
+        ],
+        responses={
+            200: openapi.Response(
+                description="Availability of the phone number",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'phone_number': openapi.Schema(type=openapi.TYPE_STRING, example="+998901234567"),
+                        'available': openapi.Schema(type=openapi.TYPE_BOOLEAN, example=True),
+                    }
+                ),
+                examples={
+                    "application/json": {
+                        "phone_number": "+998901234567",
+                        "available": True
+                    }
+                }
+            ),
+            400: openapi.Response(
+                description="Bad Request",
+                examples={
+                    "application/json": {
+                        "phone_number": [INVALID_FORMAT_MESSAGE]
+                    }
+                }
+            )
+        },
+        tags=['Authentication'],
+    )
+
+
+def login_operation(openapi):
+    return dict(
+        operation_summary="Login User",
+        operation_description="Authenticate a user with phone number and password using form data. Returns access and refresh tokens along with user details.",
+        manual_parameters=[
+            openapi.Parameter(
+                name='phone_number',
+                in_=openapi.IN_FORM,
+                type=openapi.TYPE_STRING,
+                required=True,
+                description="User's phone number (e.g., +998901234567)",
+                max_length=30,
+                example="+998901234567"
+            ),
+            openapi.Parameter(
+                name='password',
+                in_=openapi.IN_FORM,
+                type=openapi.TYPE_STRING,
+                required=True,
+                description="User's password",
+                format='password'
+            ),
+        ],
+        consumes=['multipart/form-data', 'application/x-www-form-urlencoded'],
+        responses={
+            200: openapi.Response(
+                description="User logged in successfully",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'access': openapi.Schema(type=openapi.TYPE_STRING, description="JWT access token",
+                                                 example="eyJ0eXAiOiJKV1QiLCJhbGciOiJIUzI1NiJ9..."),
+                        'refresh': openapi.Schema(type=openapi.TYPE_STRING, description="JWT refresh token",
+                                                  example="eyJ0eXAiOiJKV1QiLCJhbGciOiJIUzI1NiJ9..."),
+                        'user': openapi.Schema(
+                            type=openapi.TYPE_OBJECT,
+                            properties={
+                                'phone_number': openapi.Schema(type=openapi.TYPE_STRING, example="+998901234567"),
+                                'country': openapi.Schema(type=openapi.TYPE_STRING, example="UZ"),
+                            }
+                        )
+                    }
+                ),
+                examples={
+                    "application/json": {
+                        "access": "eyJ0eXAiOiJKV1QiLCJhbGciOiJIUzI1NiJ9...",
+                        "refresh": "eyJ0eXAiOiJKV1QiLCJhbGciOiJIUzI1NiJ9...",
+                        "user": {
+                            "phone_number": "+998901234567",
+                            "country": "UZ"
+                        }
+                    }
+                }
+            ),
+            400: openapi.Response(
+                description="Bad Request",
+                examples={
+                    "application/json": {
+                        "phone_number": ["This field is required."],
+                        "password": ["This field is required."]
+                    }
+                }
+            )
+        },
+        tags=['Authentication'],
+    )
+
+
+def refresh_operation(openapi):
+    return dict(
+        operation_summary="Refresh Tokens",
+        operation_description="Exchange a refresh token for a new access token using form data. With token rotation enabled a new refresh token is returned as well and the old one is blacklisted; presenting the old one again within a short grace period returns the same new pair.",
+        manual_parameters=[
+            openapi.Parameter(
+                name='refresh',
+                in_=openapi.IN_FORM,
+                type=openapi.TYPE_STRING,
+                required=True,
+                description="The refresh token returned by login or a previous refresh",
+                example="eyJ0eXAiOiJKV1QiLCJhbGciOiJIUzI1NiJ9..."
+            ),
+        ],
+        consumes=['multipart/form-data', 'application/x-www-form-urlencoded'],
+        responses={
+            200: openapi.Response(
+                description="Tokens refreshed successfully",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'access': openapi.Schema(type=openapi.TYPE_STRING, description="JWT access token",
+                                                 example="eyJ0eXAiOiJKV1QiLCJhbGciOiJIUzI1NiJ9..."),
+                        'refresh': openapi.Schema(type=openapi.TYPE_STRING, description="Rotated JWT refresh token",
+                                                  example="eyJ0eXAiOiJKV1QiLCJhbGciOiJIUzI1NiJ9..."),
+                    }
+                ),
+                examples={
+                    "application/json": {
+                        "access": "eyJ0eXAiOiJKV1QiLCJhbGciOiJIUzI1NiJ9...",
+                        "refresh": "eyJ0eXAiOiJKV1QiLCJhbGciOiJIUzI1NiJ9..."
+                    }
+                }
+            ),
+            400: openapi.Response(
+                description="Bad Request",
+                examples={
+                    "application/json": {
+                        "refresh": ["This field is required."]
+                    }
+                }
+            ),
+            401: openapi.Response(
+                description="Unauthorized - The refresh token is invalid, expired or blacklisted",
+                examples={
+                    "application/json": {
+                        "detail": ["Invalid token."]
+                    }
+                }
+            )
+        },
+        tags=['Authentication'],
+    )
+
+
+def logout_operation(openapi):
+    return dict(
+        operation_summary="Logout User",
+        operation_description="Log out an authenticated user by blacklisting the provided refresh token using form data. Requires a valid JWT access token in the Authorization header (Bearer <access_token>).",
+        manual_parameters=[
+            openapi.Parameter(
+                name='refresh',
+                in_=openapi.IN_FORM,
+                type=openapi.TYPE_STRING,
+                required=True,
+                description="The refresh token to blacklist for logout",
+                example="eyJ0eXAiOiJKV1QiLCJhbGciOiJIUzI1NiJ9..."
+            ),
+        ],
+        security=[{'Bearer': []}],
+        consumes=['multipart/form-data', 'application/x-www-form-urlencoded'],
+        responses={
+            200: openapi.Response(
+                description="User logged out successfully",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'message': openapi.Schema(type=openapi.TYPE_STRING, example="User logged out successfully")
+                    }
+                ),
+                examples={
+                    "application/json": {
+                        "message": "User logged out successfully"
+                    }
+                }
+            ),
+            400: openapi.Response(
+                description="Bad Request",
+                examples={
+                    "application/json": {
+                        "refresh": ["This field is required."],
+                        "detail": ["Invalid token."]
+                    }
+                }
+            ),
+            401: openapi.Response(
+                description="Unauthorized - Authentication credentials were not provided or are invalid",
+                examples={
+                    "application/json": {
+                        "detail": "Authentication credentials were not provided."
+                    }
+                }
+            )
+        },
+        tags=['Authentication'],
+    )
+
+
+def _profile_schema(openapi):
+    return openapi.Schema(
+        type=openapi.TYPE_OBJECT,
+        properties={
+            'id': openapi.Schema(type=openapi.TYPE_INTEGER, example=1),
+            'phone_number': openapi.Schema(type=openapi.TYPE_STRING, example="+998901234567"),
+            'country': openapi.Schema(type=openapi.TYPE_STRING, example="Uzbekistan"),
+            'is_verified': openapi.Schema(type=openapi.TYPE_BOOLEAN, example=False),
+            'date_joined': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME),
+            'created_at': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME),
+            'updated_at': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME),
+        }
+    )
+
+
+def _unauthorized_response(openapi):
+    return openapi.Response(
+        description="Unauthorized - Authentication credentials were not provided or are invalid",
+        examples={
+            "application/json": {
+                "detail": "Authentication credentials were not provided."
+            }
+        }
+    )
+
+
+def me_operation(openapi):
+    return dict(
+        operation_summary="Get Own Profile",
+        operation_description="Profile of the authenticated user, with an ETag. Send the ETag back in If-None-Match to get a 304 with no body while the profile is unchanged.",
+        manual_parameters=[
+            openapi.Parameter(
+                name='If-None-Match',
+                in_=openapi.IN_HEADER,
+                type=openapi.TYPE_STRING,
+                description="ETag of the profile the client already has"
+            ),
+        ],
+        responses={
+            200: openapi.Response(description="The profile", schema=_profile_schema(openapi)),
+            304: openapi.Response(description="Not Modified - the profile still matches If-None-Match"),
+            401: _unauthorized_response(openapi),
+        },
+        tags=['Authentication'],
+    )
+
+
+def me_update_operation(openapi):
+    return dict(
+        operation_summary="Update Own Profile",
+        operation_description="Change the country of the authenticated user. With If-Match, the change is only applied if the profile still has that ETag.",
+        manual_parameters=[
+            openapi.Parameter(
+                name='If-Match',
+                in_=openapi.IN_HEADER,
+                type=openapi.TYPE_STRING,
+                description="ETag the profile must still have"
+            ),
+        ],
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'country': openapi.Schema(
+                    type=openapi.TYPE_STRING,
+                    enum=[choice[0] for choice in COUNTRY_CHOICES],
+                    example="Uzbekistan"
+                ),
+            }
+        ),
+        responses={
+            200: openapi.Response(description="The updated profile", schema=_profile_schema(openapi)),
+            400: openapi.Response(
+                description="Bad Request",
+                examples={
+                    "application/json": {
+                        "country": ["\"Mars\" is not a valid choice."]
+                    }
+                }
+            ),
+            401: _unauthorized_response(openapi),
+            412: openapi.Response(
+                description="Precondition Failed - the profile changed since it was read",
+                examples={
+                    "application/json": {
+                        "detail": ["The profile was modified, fetch it again."]
+                    }
+                }
+            ),
+        },
+        tags=['Authentication'],
+    )
@@ -1,8 +1,25 @@
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
-from authentication.models import UserModel
-from authentication.utils import validate_password_uppercase
+from authentication.export import FORMATS
+from authentication.metrics import timed
+from authentication.models import COUNTRY_CHOICES, UserModel
+from authentication.utils import get_country_from_phone, validate_password_uppercase, validate_phone_number
+
+DUPLICATE_PHONE_ERROR = {'phone_number': ['User with this phone number already exists.']}
+
+
+def insert_user(user):
+    """
+    Save a new, validated user with a single INSERT. A taken number raises
+    IntegrityError, without breaking an enclosing transaction.
+    """
+    if transaction.get_connection().in_atomic_block:
+        with transaction.atomic():
+            user.save(force_insert=True)
+    else:
+        user.save(force_insert=True)
 
 
 class RegisterSerializer(serializers.ModelSerializer):
@@ -22,6 +39,10 @@ class RegisterSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserModel
         fields = ['phone_number', 'password', 'password_confirm', 'country']
+        # Uniqueness is left to the unique index, see create().
+        extra_kwargs = {
+            'phone_number': {'validators': [validate_phone_number]},
+        }
 
     def validate(self, data):
         if data['password'] != data['password_confirm']:
@@ -31,15 +52,36 @@ class RegisterSerializer(serializers.ModelSerializer):
         return data
 
     def create(self, validated_data):
-        validated_data.pop('password_confirm')
-        user = UserModel.objects.create_user(
-            phone_number=validated_data['phone_number'],
-            password=validated_data['password'],
-            country=validated_data.get('country')
+        # The fields were validated above, so this skips create_user's
+        # full_clean() and its uniqueness query: one INSERT, and a taken
+        # number surfaces as an IntegrityError.
+        phone_number = UserModel.objects.normalize_phone_number(validated_data['phone_number'])
+        user = UserModel(
+            phone_number=phone_number,
+            country=get_country_from_phone(phone_number) or validated_data.get('country'),
         )
+        user.set_password(validated_data['password'])
+        try:
+            insert_user(user)
+        except IntegrityError:
+            raise serializers.ValidationError(DUPLICATE_PHONE_ERROR)
         return user
 
 
+class BatchRegisterRowSerializer(RegisterSerializer):
+    """
+    Validates a single row of a batch registration with the RegisterSerializer
+    rules. Phone number uniqueness is checked for the whole batch at once.
+    """
+    password_confirm = None
+
+    class Meta(RegisterSerializer.Meta):
+        fields = ['phone_number', 'password', 'country']
+
+    def validate(self, data):
+        return data
+
+
 class LoginSerializer(serializers.Serializer):
     phone_number = serializers.CharField()
     password = serializers.CharField(
@@ -47,6 +89,7 @@ class LoginSerializer(serializers.Serializer):
         style={'input_type': 'password'}
     )
 
+    @timed('authenticate')
     def validate(self, attrs):
         phone_number = attrs.get('phone_number')
         password = attrs.get('password')
@@ -81,3 +124,28 @@ class UserProfileSerializer(serializers.ModelSerializer):
             'id', 'phone_number', 'is_verified',
             'date_joined', 'created_at', 'updated_at'
         ]
+
+    @timed('serialize')
+    def to_representation(self, instance):
+        return super().to_representation(instance)
+
+
+class AsyncLoginSerializer(LoginSerializer):
+    """
+    Field validation only, the async login view checks the credentials.
+    """
+
+    def validate(self, attrs):
+        return attrs
+
+
+class UserExportSerializer(serializers.Serializer):
+    """
+    Options of a user export, see authentication.export.
+    """
+    output = serializers.ChoiceField(choices=sorted(FORMATS), default='csv')
+    country = serializers.ChoiceField(choices=COUNTRY_CHOICES, required=False)
+    is_verified = serializers.BooleanField(required=False)
+    created_after = serializers.DateTimeField(required=False)
+    created_before = serializers.DateTimeField(required=False)
+    after = serializers.IntegerField(min_value=0, default=0)
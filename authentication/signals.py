@@ -0,0 +1,49 @@
+from django.core.signals import setting_changed
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from authentication.authentication import verified_token_cache
+from authentication.metrics import time_query
+from authentication.models import UserModel
+from authentication.registry import phone_registry
+from authentication.revocation import revocation_cache
+from authentication.writebehind import last_login_buffer
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def add_to_revocation_cache(sender, instance, created, **kwargs):
+    if created:
+        revocation_cache.add(instance.token.jti)
+
+
+@receiver(post_save, sender=UserModel)
+def add_to_phone_registry(sender, instance, **kwargs):
+    phone_registry.add(instance.phone_number)
+
+
+@receiver(post_delete, sender=UserModel)
+def discard_from_phone_registry(sender, instance, **kwargs):
+    phone_registry.discard(instance.phone_number)
+
+
+# Replaces django.contrib.auth's update_last_login receiver, disconnected
+# in AuthenticationConfig.ready, so session logins are buffered as well.
+def buffer_last_login(sender, user, **kwargs):
+    user.last_login = timezone.now()
+    last_login_buffer.add(user.pk, user.last_login)
+
+
+@receiver(connection_created)
+def install_query_timer(sender, connection, **kwargs):
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+@receiver(setting_changed)
+def reset_verified_token_cache(sender, setting, **kwargs):
+    # Cached tokens were validated under the old settings.
+    if setting in ('AUTHENTICATION', 'SIMPLE_JWT'):
+        verified_token_cache.reset()
@@ -0,0 +1,68 @@
+"""
+Maintenance jobs that can be run from cron, a task queue or the matching
+management command.
+"""
+import time
+
+from django.db import transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from authentication.conf import app_settings
+
+
+def _prune(queryset, batch_size, start_id, sleep):
+    """
+    Delete the rows of queryset in windows of batch_size primary keys,
+    each window in its own short transaction. Yields
+    (window end, rows deleted) after every window.
+    """
+    bounds = queryset.model.objects.order_by().aggregate(first=Min('pk'), last=Max('pk'))
+    if bounds['last'] is None:
+        return
+    low = max(start_id, bounds['first'])
+    while low <= bounds['last']:
+        high = low + batch_size
+        with transaction.atomic():
+            deleted, _ = queryset.filter(pk__gte=low, pk__lt=high).delete()
+        yield high, deleted
+        low = high
+        if sleep:
+            time.sleep(sleep)
+
+
+def prune_expired_tokens(batch_size=None, blacklisted_start_id=0, outstanding_start_id=0,
+                         sleep=None, progress=None):
+    """
+    Delete blacklist entries and outstanding tokens whose refresh token
+    has expired. Blacklist entries go first so the outstanding token
+    deletes don't cascade.
+
+    Rows are deleted by primary key range, so every batch is an index
+    range scan holding locks for a moment only, and a stopped run resumes
+    from the last reported id. progress, if given, is called with
+    (table, next start id, rows deleted so far, elapsed seconds) after
+    every batch.
+
+    Returns {table: {'deleted': rows, 'seconds': elapsed}}.
+    """
+    batch_size = batch_size or app_settings.TOKEN_PRUNE_BATCH_SIZE
+    sleep = app_settings.TOKEN_PRUNE_SLEEP if sleep is None else sleep
+    now = timezone.now()
+    jobs = (
+        (BlacklistedToken.objects.filter(token__expires_at__lt=now), blacklisted_start_id),
+        (OutstandingToken.objects.filter(expires_at__lt=now), outstanding_start_id),
+    )
+
+    results = {}
+    for queryset, start_id in jobs:
+        table = queryset.model._meta.db_table
+        total = 0
+        started = time.monotonic()
+        for next_id, deleted in _prune(queryset.order_by(), batch_size, start_id, sleep):
+            total += deleted
+            if progress is not None:
+                progress(table, next_id, total, time.monotonic() - started)
+        results[table] = {'deleted': total, 'seconds': time.monotonic() - started}
+    return results
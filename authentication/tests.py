@@ -1,3 +1,1329 @@
-from django.test import TestCase
+import csv
+import gzip
+import json
+from concurrent.futures import Future
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
+from django.contrib.auth.hashers import make_password
+from django.core.cache import caches
+from django.db import connection
+from django.db.models import Q
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse, reverse_lazy
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from authentication.admin import CustomUserAdmin
+from authentication.authentication import ClaimsJWTAuthentication, ClaimsUser, verified_token_cache
+from authentication.benchmarks.baseline import find_regressions
+from authentication.benchmarks.micro import run_middleware_comparison
+from authentication.checks import check_refresh_grace_cache
+from authentication import hashing
+from authentication.conf import app_settings
+from authentication.exceptions import PasswordPoolBusy
+from authentication.export import EXPORT_FIELDS, export_queryset, export_users, iter_batches
+from authentication.managers import prefix_range_q
+from authentication.models import UserModel
+from authentication.paginators import EstimatedCountPaginator, KeysetPaginator, decode_cursor, encode_cursor
+from authentication.permissions import IsOwnerOrReadOnly
+from authentication.phone import COUNTRIES, Country, _compile, classify, country_for_prefix, digits, normalize
+from authentication.registry import PhoneRegistry, phone_registry
+from authentication.revocation import RevocationCache, revocation_cache
+from authentication.routers import ReplicaRouter, new_state, reset_state, reset_thread_state, use_state
+from authentication.renderers import registered_user, render_json, user_profile
+from authentication.serializers import DUPLICATE_PHONE_ERROR, RegisterSerializer, UserProfileSerializer
+from authentication.throttling import ScopedKeyThrottle, athrottle_wait
+from authentication.tokens import RefreshToken, grace_key
+from authentication.utils import get_country_from_phone, validate_phone_number, validate_phone_numbers
+from authentication.views import profile_etag
+from authentication.warmup import build_filters, prepare_server, warm_up
+from authentication.writebehind import WriteBehindBuffer, last_login_buffer, outstanding_token_buffer
+from config import schema
+from config.test_runner import REPLICA_ALIAS
+
+PASSWORD = 'Samarkand2025Gate'
+
+
+def authentication_settings(**overrides):
+    return override_settings(AUTHENTICATION={**settings.AUTHENTICATION, **overrides})
+
+
+class APITestCase(TestCase):
+    """Starts every test with empty rate limit history"""
+
+    def setUp(self):
+        caches[app_settings.THROTTLE_CACHE].clear()
+
+    def create_user(self, phone_number='+998901234567', **kwargs):
+        return UserModel.objects.create_user(phone_number, PASSWORD, **kwargs)
+
+    def auth(self, user):
+        """Authorization header for an access token of user"""
+        return {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(user).access_token}'}
+
+
+class CompiledRepresentationTests(SimpleTestCase):
+    def make_user(self, **kwargs):
+        fields = {
+            'id': 42,
+            'phone_number': '+998901234567',
+            'country': 'Uzbekistan',
+            'is_verified': True,
+            'date_joined': datetime(2025, 1, 2, 3, 4, 5, 678901, tzinfo=dt_timezone.utc),
+            'created_at': datetime(2025, 6, 1, 12, 0, tzinfo=dt_timezone.utc),
+            'updated_at': None,
+        }
+        fields.update(kwargs)
+        return UserModel(**fields)
+
+    def assertSameOutput(self, user):
+        self.assertEqual(user_profile(user), UserProfileSerializer(user).data)
+        self.assertEqual(
+            render_json({'user': user_profile(user)}),
+            JSONRenderer().render({'user': UserProfileSerializer(user).data}),
+        )
+        self.assertEqual(
+            render_json(registered_user(user)),
+            JSONRenderer().render(RegisterSerializer(user).data),
+        )
+
+    def test_matches_drf(self):
+        self.assertSameOutput(self.make_user())
+
+    def test_matches_drf_with_nulls(self):
+        self.assertSameOutput(self.make_user(id=None, is_verified=False, created_at=None))
+
+    def test_matches_drf_across_timezones(self):
+        user = self.make_user(updated_at=timezone.now())
+        for tz in ('UTC', 'Asia/Tashkent', 'America/New_York'):
+            with self.subTest(tz=tz), timezone.override(tz):
+                self.assertSameOutput(user)
+
+    @override_settings(USE_TZ=False)
+    def test_matches_drf_with_naive_datetimes(self):
+        self.assertSameOutput(self.make_user(
+            date_joined=datetime(2025, 1, 2, 3, 4, 5),
+            created_at=datetime(2025, 6, 1, 12, 0),
+        ))
+
+    def test_escapes_line_separators(self):
+        user = self.make_user(phone_number='+998\u2028\u2029')
+        self.assertEqual(
+            render_json(user_profile(user)),
+            JSONRenderer().render(UserProfileSerializer(user).data),
+        )
+
+
+class RecordingBuffer(WriteBehindBuffer):
+    setting = 'LAST_LOGIN_WRITE_BEHIND'
+
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    def write(self, batch):
+        self.batches.append(batch)
+
+
+class FailingBuffer(RecordingBuffer):
+    def __init__(self, bad_key):
+        super().__init__()
+        self.bad_key = bad_key
+
+    def write(self, batch):
+        if self.bad_key in batch:
+            raise ValueError(self.bad_key)
+        super().write(batch)
+
+
+class WriteBehindTests(APITestCase):
+    def test_test_runner_writes_synchronously(self):
+        self.assertFalse(app_settings.LAST_LOGIN_WRITE_BEHIND)
+        self.assertFalse(app_settings.OUTSTANDING_TOKEN_WRITE_BEHIND)
+
+        user = self.create_user()
+        response = self.client.post(reverse('login'), {'phone_number': user.phone_number, 'password': PASSWORD})
+
+        self.assertEqual(response.status_code, 200)
+        user.refresh_from_db()
+        self.assertIsNotNone(user.last_login)
+        self.assertTrue(OutstandingToken.objects.filter(user=user).exists())
+        self.assertIsNone(last_login_buffer.pop(user.pk))
+
+    def test_disabled_buffer_writes_on_add(self):
+        buffer = RecordingBuffer()
+        buffer.add(1, 'first')
+        self.assertEqual(buffer.batches, [{1: 'first'}])
+
+    @authentication_settings(LAST_LOGIN_WRITE_BEHIND=True)
+    def test_enabled_buffer_writes_latest_values_on_flush(self):
+        buffer = RecordingBuffer()
+        with mock.patch.object(buffer, '_ensure_thread'):
+            buffer.add(1, 'first')
+            buffer.add(1, 'second')
+            buffer.add(2, 'other')
+        self.assertEqual(buffer.batches, [])
+
+        buffer.flush()
+        self.assertEqual(buffer.batches, [{1: 'second', 2: 'other'}])
+
+    @authentication_settings(LAST_LOGIN_WRITE_BEHIND=True, WRITE_BEHIND_MAX_ATTEMPTS=2)
+    def test_failing_entry_does_not_block_the_others(self):
+        buffer = FailingBuffer(bad_key=1)
+        with mock.patch.object(buffer, '_ensure_thread'):
+            buffer.add(1, 'bad')
+            buffer.add(2, 'good')
+
+        with self.assertLogs('authentication.writebehind', 'WARNING'):
+            buffer.flush()
+        self.assertEqual(buffer.batches, [{2: 'good'}])
+        self.assertEqual(buffer._pending, {1: 'bad'})
+
+        with self.assertLogs('authentication.writebehind', 'ERROR') as logs:
+            buffer.flush()
+        self.assertIn('after 2 attempts', logs.output[-1])
+        self.assertEqual(buffer._pending, {})
+        self.assertEqual(buffer._attempts, {})
+
+    @authentication_settings(LAST_LOGIN_WRITE_BEHIND=True)
+    def test_newer_value_replaces_a_failed_one(self):
+        buffer = FailingBuffer(bad_key=1)
+        with mock.patch.object(buffer, '_ensure_thread'):
+            buffer.add(1, 'bad')
+            with self.assertLogs('authentication.writebehind', 'WARNING'):
+                buffer.flush()
+            buffer.bad_key = None
+            buffer.add(1, 'fixed')
+
+        buffer.flush()
+        self.assertEqual(buffer.batches, [{1: 'fixed'}])
+        self.assertEqual(buffer._attempts, {})
+
+
+class RegisterTests(APITestCase):
+    data = {'phone_number': '+998901111111', 'password': PASSWORD, 'password_confirm': PASSWORD}
+
+    def test_register_is_a_single_insert(self):
+        serializer = RegisterSerializer(data=self.data)
+        self.assertTrue(serializer.is_valid())
+        with CaptureQueriesContext(connection) as queries:
+            user = serializer.save()
+
+        statements = [query['sql'] for query in queries if 'SAVEPOINT' not in query['sql']]
+        self.assertEqual(len(statements), 1, statements)
+        self.assertTrue(statements[0].startswith(f'INSERT INTO "{UserModel._meta.db_table}"'))
+        self.assertEqual(user.country, 'Uzbekistan')
+        self.assertTrue(user.check_password(PASSWORD))
+
+    def test_duplicate_phone_number(self):
+        self.create_user(phone_number=self.data['phone_number'])
+        for name in ('register', 'async-register'):
+            with self.subTest(name=name):
+                response = self.client.post(reverse(name), self.data)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), DUPLICATE_PHONE_ERROR)
+        self.assertEqual(UserModel.objects.count(), 1)
+
+
+@authentication_settings(OUTSTANDING_TOKEN_WRITE_BEHIND=True)
+class OutstandingTokenBufferTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(outstanding_token_buffer, '_ensure_thread')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(outstanding_token_buffer.flush)
+        self.user = self.create_user()
+
+    def test_issued_token_waits_in_the_buffer(self):
+        token = RefreshToken.for_user(self.user)
+        self.assertFalse(OutstandingToken.objects.filter(jti=token['jti']).exists())
+
+        outstanding_token_buffer.flush()
+        self.assertTrue(OutstandingToken.objects.filter(jti=token['jti'], user=self.user).exists())
+
+    def test_blacklist_writes_the_pending_row(self):
+        token = RefreshToken.for_user(self.user)
+        _, created = token.blacklist()
+
+        self.assertTrue(created)
+        self.assertTrue(BlacklistedToken.objects.filter(token__jti=token['jti']).exists())
+        self.assertIsNone(outstanding_token_buffer.pop(token['jti']))
+
+    def test_flush_skips_tokens_of_deleted_users(self):
+        other = self.create_user(phone_number='+998907654321')
+        kept = RefreshToken.for_user(self.user)
+        RefreshToken.for_user(other)
+        UserModel.objects.filter(pk=other.pk).delete()
+
+        outstanding_token_buffer.flush()
+        self.assertEqual(list(OutstandingToken.objects.values_list('jti', flat=True)), [kept['jti']])
+        self.assertIsNone(outstanding_token_buffer.pop(kept['jti']))
+
+    def test_flush_skips_rows_that_already_exist(self):
+        first = RefreshToken.for_user(self.user)
+        second = RefreshToken.for_user(self.user)
+        # Written meanwhile by another process.
+        OutstandingToken.objects.create(**first.outstanding_fields(self.user))
+
+        outstanding_token_buffer.flush()
+        self.assertEqual(
+            set(OutstandingToken.objects.values_list('jti', flat=True)), {first['jti'], second['jti']},
+        )
+
+
+class BatchRegisterTests(APITestCase):
+    url = reverse_lazy('register-batch')
+
+    def setUp(self):
+        super().setUp()
+        self.staff = self.create_user('+998900000001', is_staff=True)
+
+    def post(self, data, content_type='application/json', user=None):
+        return self.client.post(self.url, data, content_type=content_type, **self.auth(user or self.staff))
+
+    def row(self, phone_number, **kwargs):
+        return {'phone_number': phone_number, 'password': PASSWORD, 'country': 'Uzbekistan', **kwargs}
+
+    def test_creates_users(self):
+        response = self.post([self.row('+998901111111'), self.row('+998902222222')])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['created'], 2)
+        self.assertEqual([result['status'] for result in response.json()['results']], ['created', 'created'])
+        user = UserModel.objects.get(phone_number='+998901111111')
+        self.assertTrue(user.check_password(PASSWORD))
+        self.assertEqual(user.phone_digits, '998901111111')
+
+    def test_partial_failures_keep_input_order(self):
+        self.create_user('+998903333333')
+        response = self.post([
+            self.row('+998901111111'),
+            self.row('+998903333333'),
+            self.row('not a number'),
+            'not an object',
+            self.row('+998904444444', password='short'),
+        ])
+
+        body = response.json()
+        self.assertEqual((body['created'], body['failed']), (1, 4))
+        results = body['results']
+        self.assertEqual([result['index'] for result in results], [0, 1, 2, 3, 4])
+        self.assertEqual(results[0]['status'], 'created')
+        self.assertEqual(results[1]['errors'], {'phone_number': ['User with this phone number already exists.']})
+        self.assertIn('phone_number', results[2]['errors'])
+        self.assertEqual(results[3]['errors'], {'non_field_errors': ['Expected an object.']})
+        self.assertIn('password', results[4]['errors'])
+        self.assertFalse(UserModel.objects.filter(phone_number='+998904444444').exists())
+
+    def test_duplicate_rows_in_one_batch(self):
+        response = self.post([self.row('+998901111111'), self.row('+998901111111')])
+
+        results = response.json()['results']
+        self.assertEqual(results[0]['status'], 'created')
+        self.assertEqual(results[1]['errors'], {
+            'phone_number': ['Phone number appears more than once in this batch.']
+        })
+        self.assertEqual(UserModel.objects.filter(phone_number='+998901111111').count(), 1)
+
+    def test_ndjson(self):
+        lines = '{"phone_number": "+998901111111", "password": "%s"}\n\n' % PASSWORD
+        response = self.post(lines, content_type='application/x-ndjson')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['created'], 1)
+
+    def test_ndjson_parse_error_names_the_line(self):
+        response = self.post('{"phone_number": "+998901111111"}\n{oops\n', content_type='application/x-ndjson')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('line 2', response.json()['detail'])
+        self.assertFalse(UserModel.objects.filter(phone_number='+998901111111').exists())
+
+    def test_rejects_non_list_and_oversized_batches(self):
+        self.assertEqual(self.post({'phone_number': '+998901111111'}).json(), {'detail': ['Expected a list of users.']})
+        with authentication_settings(BATCH_REGISTER_MAX_ROWS=1):
+            response = self.post([self.row('+998901111111'), self.row('+998902222222')])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(UserModel.objects.count(), 1)
+
+    def test_staff_only(self):
+        user = self.create_user('+998905555555')
+        self.assertEqual(self.post([self.row('+998901111111')], user=user).status_code, 403)
+        self.assertEqual(self.client.post(self.url, [], content_type='application/json').status_code, 401)
+        self.assertFalse(UserModel.objects.filter(phone_number='+998901111111').exists())
+
+
+class AsyncViewParityTests(APITestCase):
+    """The async views answer like the DRF views they mirror"""
+
+    def register_data(self, phone_number):
+        return {
+            'phone_number': phone_number, 'password': PASSWORD,
+            'password_confirm': PASSWORD, 'country': 'Uzbekistan',
+        }
+
+    async def both(self, sync_name, async_name, data_for):
+        """POST to both views, returns [(status, body)] for sync then async"""
+        responses = []
+        for index, name in enumerate((sync_name, async_name)):
+            response = await self.async_client.post(reverse(name), data_for(index))
+            responses.append((response.status_code, response.json()))
+        return responses
+
+    def assertSameShape(self, responses):
+        (sync_status, sync_body), (async_status, async_body) = responses
+        self.assertEqual(sync_status, async_status)
+        self.assertEqual(sync_body.keys(), async_body.keys())
+        for key in ('user', 'user_info'):
+            if key in sync_body:
+                self.assertEqual(sync_body[key].keys(), async_body[key].keys())
+
+    async def test_register(self):
+        phone_numbers = ['+998901111111', '+998902222222']
+        created = await self.both('register', 'async-register', lambda i: self.register_data(phone_numbers[i]))
+        self.assertSameShape(created)
+        self.assertEqual(created[0][0], 201)
+        self.assertEqual(await UserModel.objects.filter(phone_number__in=phone_numbers).acount(), 2)
+
+        duplicate = await self.both('register', 'async-register', lambda i: self.register_data(phone_numbers[i]))
+        self.assertEqual(duplicate[0], duplicate[1])
+        self.assertEqual(duplicate[0][0], 400)
+
+        invalid = await self.both('register', 'async-register', lambda i: {'phone_number': 'nope'})
+        self.assertEqual(invalid[0], invalid[1])
+
+    async def test_login_and_logout(self):
+        user = await UserModel.objects.acreate(phone_number='+998901111111', password=make_password(PASSWORD))
+        credentials = {'phone_number': user.phone_number, 'password': PASSWORD}
+
+        login = await self.both('login', 'async-login', lambda i: credentials)
+        self.assertSameShape(login)
+        self.assertEqual(login[0][0], 200)
+        self.assertEqual(login[0][1]['user'], login[1][1]['user'])
+        await user.arefresh_from_db()
+        self.assertIsNotNone(user.last_login)
+
+        wrong = await self.both('login', 'async-login', lambda i: {**credentials, 'password': 'Wrong1234'})
+        self.assertEqual(wrong[0], wrong[1])
+        self.assertEqual(wrong[0][0], 400)
+
+        refresh_tokens = [login[0][1]['refresh'], login[1][1]['refresh']]
+        logout = await self.both('logout', 'async-logout', lambda i: {'refresh': refresh_tokens[i]})
+        self.assertEqual(logout[0], logout[1])
+        self.assertEqual(logout[0][0], 200)
+        self.assertEqual(await BlacklistedToken.objects.acount(), 2)
+
+        # Each path rejects tokens blacklisted by the other.
+        again = await self.both('logout', 'async-logout', lambda i: {'refresh': refresh_tokens[1 - i]})
+        self.assertEqual(again[0], again[1])
+        self.assertEqual(again[0][0], 400)
+
+    async def test_async_views_are_throttled(self):
+        with override_settings(REST_FRAMEWORK={
+            **settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {'login_ip': '1/min'},
+        }):
+            credentials = {'phone_number': '+998901111111', 'password': PASSWORD}
+            await self.async_client.post(reverse('async-login'), credentials)
+            response = await self.async_client.post(reverse('async-login'), credentials)
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+
+@authentication_settings(REVOCATION_SYNC_INTERVAL=0)
+class RevocationCacheTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user()
+        self.cache = RevocationCache()
+
+    def blacklist(self, jti, **kwargs):
+        outstanding = OutstandingToken.objects.create(
+            user=self.user, jti=jti, token=jti,
+            created_at=timezone.now(), expires_at=timezone.now() + timedelta(days=1),
+        )
+        return BlacklistedToken.objects.create(token=outstanding, **kwargs)
+
+    def test_revoked_and_not_revoked(self):
+        self.blacklist('revoked')
+        self.assertTrue(self.cache.is_revoked('revoked'))
+        self.assertFalse(self.cache.is_revoked('valid'))
+
+        self.blacklist('later')
+        self.assertTrue(self.cache.is_revoked('later'))
+
+    def test_picks_up_rows_committed_out_of_id_order(self):
+        self.blacklist('high', id=10)
+        self.assertTrue(self.cache.is_revoked('high'))
+
+        # A transaction that took a lower id commits after 'high' was read.
+        self.blacklist('late', id=9)
+        self.assertTrue(self.cache.is_revoked('late'))
+
+    @authentication_settings(REVOCATION_SYNC_INTERVAL=0, REVOCATION_RESCAN_WINDOW=0)
+    def test_rescan_window_is_what_catches_them(self):
+        self.blacklist('high', id=10)
+        self.cache.is_revoked('high')
+        self.blacklist('late', id=9)
+        self.assertFalse(self.cache.is_revoked('late'))
+
+    @authentication_settings(REVOCATION_SYNC_INTERVAL=3600)
+    def test_reset_rebuilds_on_next_check(self):
+        self.assertFalse(self.cache.is_revoked('revoked'))
+        self.blacklist('revoked')
+        # Not polled again within the interval.
+        self.assertFalse(self.cache.is_revoked('revoked'))
+
+        self.cache.reset()
+        self.assertTrue(self.cache.is_revoked('revoked'))
+
+
+class PhoneRegistryTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.registry = PhoneRegistry()
+
+    def test_registered_and_not_registered(self):
+        self.create_user(phone_number='+998901111111')
+        self.assertTrue(self.registry.is_registered('+998901111111'))
+        self.assertFalse(self.registry.is_registered('+998902222222'))
+        self.assertEqual(self.registry.stats()['negatives'], 1)
+
+    def test_picks_up_rows_committed_out_of_id_order(self):
+        UserModel.objects.create(id=10, phone_number='+998901111111')
+        self.assertTrue(self.registry.is_registered('+998901111111'))
+
+        UserModel.objects.create(id=9, phone_number='+998902222222')
+        with authentication_settings(PHONE_REGISTRY_SYNC_INTERVAL=0):
+            self.assertTrue(self.registry.is_registered('+998902222222'))
+
+    @authentication_settings(PHONE_REGISTRY_SYNC_INTERVAL=0)
+    def test_deleted_numbers_trigger_a_rebuild(self):
+        user = self.create_user(phone_number='+998901111111')
+        self.registry.prepare()
+        self.registry.discard(user.phone_number)
+        user.delete()
+        self.assertFalse(self.registry.is_registered('+998901111111'))
+        self.assertEqual(self.registry.stats()['deleted'], 0)
+
+    def test_build_filters_at_startup(self):
+        self.create_user(phone_number='+998901111111')
+        phone_registry.reset()
+        revocation_cache.reset()
+        self.addCleanup(phone_registry.reset)
+        self.addCleanup(revocation_cache.reset)
+
+        with mock.patch('authentication.warmup.connections') as connections:
+            build_filters()
+        connections.close_all.assert_called_once_with()
+        with self.assertNumQueries(0):
+            self.assertFalse(phone_registry.is_registered('+998902222222'))
+            self.assertFalse(revocation_cache.is_revoked('unknown'))
+
+
+@authentication_settings(CLAIMS_ONLY_USER=True)
+class ClaimsUserTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user(is_verified=True)
+        token = RefreshToken.for_user(self.user).access_token
+        self.claims_user = ClaimsJWTAuthentication().get_user(token)
+
+    def test_reads_claims_without_loading_the_row(self):
+        self.assertIsInstance(self.claims_user, ClaimsUser)
+        with self.assertNumQueries(0):
+            self.assertTrue(self.claims_user.is_verified)
+            self.assertEqual(self.claims_user.country, 'Uzbekistan')
+
+    def test_equals_its_user_row(self):
+        other = self.create_user('+998909999999')
+        self.assertEqual(self.claims_user, self.user)
+        self.assertEqual(self.user, self.claims_user)
+        self.assertNotEqual(self.claims_user, other)
+        self.assertNotEqual(self.claims_user, UserModel())
+        self.assertEqual(hash(self.claims_user), hash(self.user))
+
+    def test_owner_keeps_write_access(self):
+        request = mock.Mock(method='PATCH', user=self.claims_user)
+        permission = IsOwnerOrReadOnly()
+        self.assertTrue(permission.has_object_permission(request, None, self.user))
+        other = self.create_user('+998909999999')
+        self.assertFalse(permission.has_object_permission(request, None, other))
+
+
+class VerifiedTokenCacheTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        verified_token_cache.reset()
+        self.addCleanup(verified_token_cache.reset)
+
+    def test_repeated_token_is_validated_once(self):
+        headers = self.auth(self.create_user())
+        with mock.patch.object(
+            JWTAuthentication, 'get_validated_token', autospec=True,
+            side_effect=JWTAuthentication.get_validated_token,
+        ) as validate:
+            for _ in range(3):
+                self.assertEqual(self.client.get(reverse('me'), **headers).status_code, 200)
+        self.assertEqual(validate.call_count, 1)
+        self.assertEqual(verified_token_cache.stats()['hits'], 2)
+
+    def test_settings_change_resets_the_cache(self):
+        verified_token_cache.set(b'key', 'token')
+        with authentication_settings(VERIFIED_TOKEN_CACHE_SIZE=1):
+            self.assertIsNone(verified_token_cache.get(b'key'))
+            self.assertEqual(verified_token_cache.stats()['maxsize'], 1)
+        verified_token_cache.get(b'key')
+        self.assertEqual(verified_token_cache.stats()['maxsize'], app_settings.VERIFIED_TOKEN_CACHE_SIZE)
+
+
+class PhoneTests(SimpleTestCase):
+    def test_classifies_valid_numbers(self):
+        for country in COUNTRIES:
+            with self.subTest(country=country.name):
+                self.assertEqual(classify(country.example), country)
+                self.assertEqual(get_country_from_phone(country.example), country.name)
+
+    def test_rejects_invalid_numbers(self):
+        for value in ('', '998901234567', '+99890123456', '+9989012345678', '+44123456789',
+                      '+99890123456a', '+998\u0669\u0660\u0661\u0662\u0663\u0664\u0665\u0666\u0667'):
+            with self.subTest(value=value):
+                self.assertIsNone(classify(value))
+                with self.assertRaises(ValidationError):
+                    validate_phone_number(value)
+
+    def test_validate_many_returns_the_invalid_numbers(self):
+        self.assertEqual(validate_phone_numbers(['+998901234567', '+1', '+79123456789']), ['+1'])
+
+    def test_longest_dial_code_wins(self):
+        trie = _compile((
+            Country('Short', '9', (12,), ''),
+            Country('Long', '998', (9,), ''),
+        ))
+        with mock.patch('authentication.phone._TRIE', trie), mock.patch('authentication.phone.MAX_DIAL_CODE_LENGTH', 3):
+            self.assertEqual(country_for_prefix('+998901234567').name, 'Long')
+            self.assertEqual(classify('+998901234567').name, 'Long')
+            # Falls back to the shorter code when the length only fits it.
+            self.assertEqual(classify('+9989012345678').name, 'Short')
+
+    def test_duplicate_dial_codes_are_rejected(self):
+        with self.assertRaises(ValueError):
+            _compile((Country('A', '7', (10,), ''), Country('B', '7', (10,), '')))
+
+    def test_country_for_prefix_ignores_length(self):
+        self.assertEqual(get_country_from_phone('+7'), 'Russia')
+        self.assertIsNone(get_country_from_phone('79123456789'))
+
+    def test_normalize_and_digits(self):
+        self.assertEqual(normalize('998 90-123-45-67'), '+998901234567')
+        self.assertEqual(digits('+998 (90) 123'), '99890123')
+
+
+class ThrottleTests(APITestCase):
+    rates = {'login_ip': '3/min', 'login_phone': '2/min'}
+
+    def login(self, phone_number, address='10.0.0.1'):
+        return self.client.post(
+            reverse('login'), {'phone_number': phone_number, 'password': 'Wrong1234'}, REMOTE_ADDR=address
+        )
+
+    def test_limits_per_phone_number_across_addresses(self):
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': self.rates}):
+            statuses = [self.login('+998901111111', f'10.0.0.{i}').status_code for i in range(3)]
+            other_number = self.login('+998902222222', '10.0.0.9').status_code
+        self.assertEqual(statuses, [400, 400, 429])
+        self.assertEqual(other_number, 400)
+
+    def test_limits_per_address(self):
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': self.rates}):
+            statuses = [self.login(f'+99890111111{i}').status_code for i in range(4)]
+        self.assertEqual(statuses, [400, 400, 400, 429])
+
+    async def test_async_wait_uses_the_same_history(self):
+        request = RequestFactory().post('/', {'phone_number': '+998901111111'}, REMOTE_ADDR='10.0.0.1')
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': self.rates}):
+            self.assertIsNone(await athrottle_wait(request, 'login'))
+            self.assertIsNone(await athrottle_wait(request, 'login'))
+            self.assertGreater(await athrottle_wait(request, 'login'), 0)
+            self.assertIsNone(await athrottle_wait(request, 'unthrottled'))
+
+    def test_base_class_is_abstract(self):
+        with self.assertRaises(TypeError):
+            ScopedKeyThrottle()
+
+
+class FakePool:
+    """A pool that never finishes a job, started or not"""
+
+    def __init__(self, started):
+        self.started = started
+
+    def submit(self, func, *args):
+        future = Future()
+        if self.started:
+            future.set_running_or_notify_cancel()
+        return future
+
+
+class PasswordPoolTests(SimpleTestCase):
+    @authentication_settings(PASSWORD_POOL_ENABLED=True, PASSWORD_POOL_TIMEOUT=0.01)
+    def run_pooled(self, started):
+        with mock.patch.object(hashing, 'get_process_pool', return_value=FakePool(started)), \
+                mock.patch.object(hashing, '_process_pool_retry_at', 0.0), \
+                self.assertLogs('authentication.hashing', 'WARNING'):
+            return hashing.verify_password_pooled(PASSWORD, make_password(PASSWORD))
+
+    def test_queued_job_is_cancelled_and_run_inline(self):
+        self.assertEqual(self.run_pooled(started=False), (True, False))
+
+    def test_running_job_is_not_hashed_again(self):
+        with mock.patch.object(hashing, 'verify_password') as verify, self.assertRaises(PasswordPoolBusy):
+            self.run_pooled(started=True)
+        verify.assert_not_called()
+
+    def test_create_user_goes_through_set_password(self):
+        with mock.patch.object(UserModel, 'full_clean'), mock.patch.object(UserModel, 'save'):
+            user = UserModel.objects.create_user('+998901234567', PASSWORD)
+        self.assertTrue(user.check_password(PASSWORD))
+        self.assertEqual(user._password, PASSWORD)
+
+
+@authentication_settings(DATABASE_REPLICAS=[REPLICA_ALIAS])
+class ReplicaRouterTests(APITestCase):
+    databases = {'default', REPLICA_ALIAS}
+
+    def setUp(self):
+        super().setUp()
+        reset_thread_state()
+        self.addCleanup(reset_thread_state)
+        # Only on the primary, as if the replica hadn't caught up yet.
+        self.user = UserModel.objects.using('default').create(phone_number='+998901111111')
+
+    def in_request(self, pinned=False):
+        state = new_state(pinned=pinned)
+        token = use_state(state)
+        self.addCleanup(reset_state, token)
+        return state
+
+    def user_visible(self):
+        return UserModel.objects.filter(pk=self.user.pk).exists()
+
+    def test_reads_go_to_the_replica(self):
+        self.in_request()
+        self.assertEqual(ReplicaRouter().db_for_read(UserModel), REPLICA_ALIAS)
+        self.assertFalse(self.user_visible())
+
+    def test_reads_after_a_write_go_to_the_primary(self):
+        state = self.in_request()
+        self.assertFalse(self.user_visible())
+        UserModel.objects.filter(pk=self.user.pk).update(is_verified=True)
+        self.assertTrue(state['wrote'])
+        self.assertTrue(self.user_visible())
+
+    def test_pin_cookie_reads_from_the_primary(self):
+        self.in_request(pinned=True)
+        self.assertTrue(self.user_visible())
+
+    def test_token_tables_always_read_from_the_primary(self):
+        outstanding = OutstandingToken.objects.using('default').create(
+            user=self.user, jti='revoked', token='revoked',
+            created_at=timezone.now(), expires_at=timezone.now() + timedelta(days=1),
+        )
+        BlacklistedToken.objects.using('default').create(token=outstanding)
+        state = self.in_request()
+        self.assertFalse(self.user_visible())
+        self.assertTrue(BlacklistedToken.objects.filter(token__jti='revoked').exists())
+        self.assertFalse(state['pinned'])
+
+    def test_thread_pin_expires_outside_requests(self):
+        UserModel.objects.filter(pk=self.user.pk).update(is_verified=True)
+        self.assertTrue(self.user_visible())
+        with authentication_settings(DATABASE_REPLICAS=[REPLICA_ALIAS], REPLICA_LAG_TOLERANCE=0):
+            self.assertFalse(self.user_visible())
+
+    def test_middleware_sets_the_pin_cookie_after_a_write(self):
+        response = self.client.post(reverse('register'), {
+            'phone_number': '+998902222222', 'password': PASSWORD,
+            'password_confirm': PASSWORD, 'country': 'Uzbekistan',
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertIn(app_settings.REPLICA_PIN_COOKIE, response.cookies)
+
+        response = self.client.get(reverse('phone-available'), {'phone_number': '+998903333333'})
+        self.assertNotIn(app_settings.REPLICA_PIN_COOKIE, response.cookies)
+
+
+class KeysetPaginationTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        base = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+        for i in range(7):
+            user = UserModel.objects.create(phone_number=f'+99890111111{i}')
+            # Two users share each timestamp, so the id breaks ties.
+            UserModel.objects.filter(pk=user.pk).update(created_at=base + timedelta(hours=i // 2))
+        self.ordered = list(UserModel.objects.order_by('-created_at', '-id'))
+
+    def test_cursor_round_trip(self):
+        user = self.ordered[0]
+        self.assertEqual(decode_cursor(encode_cursor(user)), (user.created_at, user.pk))
+        for value in ('', 'garbage', '2025-01-01T00:00:00+00:00_x', 'nodate_5'):
+            with self.subTest(value=value):
+                self.assertIsNone(decode_cursor(value))
+
+    def test_pages_follow_the_cursor(self):
+        queryset = UserModel.objects.order_by('-created_at', '-id')
+        seen, cursor = [], None
+        while True:
+            paginator = KeysetPaginator(queryset, 3, cursor=cursor)
+            rows = list(paginator.page(1).object_list)
+            seen.extend(rows)
+            next_cursor = paginator.next_cursor(rows)
+            if next_cursor is None:
+                break
+            cursor = decode_cursor(next_cursor)
+        self.assertEqual(seen, self.ordered)
+
+    def test_estimated_count_is_exact_below_the_limit(self):
+        paginator = EstimatedCountPaginator(UserModel.objects.order_by('-id'), 3)
+        self.assertEqual(paginator.count, 7)
+        self.assertFalse(paginator.estimated)
+        with authentication_settings(ADMIN_EXACT_COUNT_LIMIT=2):
+            # SQLite has no estimate, so it counts in full.
+            paginator = EstimatedCountPaginator(UserModel.objects.order_by('-id'), 3)
+            self.assertEqual(paginator.count, 7)
+            self.assertFalse(paginator.estimated)
+
+    def test_admin_changelist_walks_pages_by_cursor(self):
+        admin_user = UserModel.objects.create_superuser('+998900000001', PASSWORD)
+        self.client.force_login(admin_user)
+        url = reverse('admin:authentication_usermodel_changelist')
+        expected = list(UserModel.objects.order_by('-created_at', '-id').values_list('pk', flat=True))
+
+        seen, query = [], ''
+        with mock.patch.object(CustomUserAdmin, 'list_per_page', 3):
+            while True:
+                response = self.client.get(url + query)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response.context['keyset_pagination'])
+                seen.extend(user.pk for user in response.context['cl'].result_list)
+                query = response.context['next_page_url']
+                if not query:
+                    break
+        self.assertEqual(seen, expected)
+
+    def test_admin_ignores_malformed_cursors(self):
+        admin_user = UserModel.objects.create_superuser('+998900000001', PASSWORD)
+        self.client.force_login(admin_user)
+        response = self.client.get(reverse('admin:authentication_usermodel_changelist'), {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 200)
+
+
+class PhoneSearchTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.tashkent = UserModel.objects.create(phone_number='+998901234567')
+        self.samarkand = UserModel.objects.create(phone_number='+998661119900')
+
+    def search(self, term):
+        return set(UserModel.objects.search_phone(term))
+
+    def test_prefix_and_suffix(self):
+        self.assertEqual(self.search('99890'), {self.tashkent})
+        self.assertEqual(self.search('4567'), {self.tashkent})
+        self.assertEqual(self.search('99 8'), {self.tashkent, self.samarkand})
+        self.assertEqual(self.search('(99866) 111'), {self.samarkand})
+
+    def test_plus_matches_prefix_only(self):
+        self.assertEqual(self.search('+99866'), {self.samarkand})
+        self.assertEqual(self.search('+4567'), set())
+
+    def test_prefix_is_a_range(self):
+        self.assertEqual(prefix_range_q('f', '1299'), Q(f__gte='1299') & Q(f__lt='13'))
+        self.assertEqual(prefix_range_q('f', '0'), Q(f__gte='0') & Q(f__lt='1'))
+        self.assertEqual(prefix_range_q('f', '99'), Q(f__gte='99'))
+        # Carries past nines on the reversed column: 0099 -> ..9900.
+        self.assertEqual(self.search('9900'), {self.samarkand})
+        self.assertEqual(self.search('99'), {self.tashkent, self.samarkand})
+
+    def test_search_uses_the_indexes(self):
+        for term, index in (('+99890', 'user_phone_digits_idx'), ('4567', 'user_phone_digits_rev_idx')):
+            with self.subTest(term=term):
+                sql, params = UserModel.objects.search_phone(term).query.sql_with_params()
+                with connection.cursor() as cursor:
+                    cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                    plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+                self.assertIn(f'USING INDEX {index}', plan)
+
+    def test_non_numbers_match_nothing(self):
+        for term in ('', '   ', 'abc', '+', '90x1'):
+            with self.subTest(term=term):
+                self.assertEqual(self.search(term), set())
+
+    def test_admin_search(self):
+        admin_user = UserModel.objects.create_superuser('+998900000001', PASSWORD)
+        self.client.force_login(admin_user)
+        url = reverse('admin:authentication_usermodel_changelist')
+
+        response = self.client.get(url, {'q': '9900'})
+        self.assertEqual(list(response.context['cl'].result_list), [self.samarkand])
+        # Anything else falls back to the admin's own search fields.
+        response = self.client.get(url, {'q': 'nobody'})
+        self.assertEqual(list(response.context['cl'].result_list), [])
+
+    def test_backfill_phone_digits(self):
+        UserModel.objects.update(phone_digits='', phone_digits_reversed='')
+        stdout = StringIO()
+        call_command('backfill_phone_digits', batch_size=1, stdout=stdout)
+        self.assertIn('Updated 2 users', stdout.getvalue())
+        self.tashkent.refresh_from_db()
+        self.assertEqual(self.tashkent.phone_digits, '998901234567')
+        self.assertEqual(self.tashkent.phone_digits_reversed, '765432109899')
+        self.assertEqual(self.search('4567'), {self.tashkent})
+
+
+class PruneTokensTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        user = self.create_user()
+        now = timezone.now()
+        self.expired = [
+            OutstandingToken.objects.create(
+                user=user, jti=f'expired-{i}', token='-', created_at=now - timedelta(days=30),
+                expires_at=now - timedelta(days=1),
+            )
+            for i in range(3)
+        ]
+        self.live = OutstandingToken.objects.create(
+            user=user, jti='live', token='-', created_at=now, expires_at=now + timedelta(days=1),
+        )
+        BlacklistedToken.objects.create(token=self.expired[0])
+
+    def test_deletes_expired_tokens_and_reports_resume_ids(self):
+        stdout = StringIO()
+        call_command('prune_tokens', batch_size=2, sleep=0, stdout=stdout)
+        self.assertEqual(list(OutstandingToken.objects.all()), [self.live])
+        self.assertFalse(BlacklistedToken.objects.exists())
+        self.assertIn(f'token_blacklist_outstandingtoken: next id {self.expired[0].pk + 2}', stdout.getvalue())
+        self.assertIn('token_blacklist_outstandingtoken: 3 expired rows deleted', stdout.getvalue())
+
+    def test_interrupt_reports_resume_ids(self):
+        def interrupted(progress, **kwargs):
+            progress('token_blacklist_blacklistedtoken', 42, 10, 1.0)
+            raise KeyboardInterrupt
+
+        with mock.patch(
+            'authentication.management.commands.prune_tokens.prune_expired_tokens', side_effect=interrupted,
+        ):
+            with self.assertRaisesMessage(
+                CommandError, 'resume with --blacklisted-start-id 42 --outstanding-start-id 7',
+            ):
+                call_command('prune_tokens', outstanding_start_id=7, verbosity=0, stdout=StringIO())
+
+
+class RefreshGraceTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.refresh = str(RefreshToken.for_user(self.create_user()))
+
+    def post(self, name, refresh):
+        return self.client.post(reverse(name), {'refresh': refresh})
+
+    def test_retry_gets_the_same_pair(self):
+        first = self.post('refresh', self.refresh)
+        self.assertEqual(first.status_code, 200)
+        retry = self.post('refresh', self.refresh)
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(self.post('refresh', first.json()['refresh']).status_code, 200)
+
+    def test_retry_after_logout_is_refused(self):
+        for i, name in enumerate(('logout', 'async-logout')):
+            with self.subTest(name=name):
+                refresh = str(RefreshToken.for_user(self.create_user(phone_number=f'+99890765432{i}')))
+                rotated = self.post('refresh', refresh).json()['refresh']
+                self.assertEqual(self.post(name, rotated).status_code, 200)
+                self.assertEqual(self.post('refresh', refresh).status_code, 401)
+
+    def test_logout_of_the_rotated_token_ends_the_grace(self):
+        for i, name in enumerate(('logout', 'async-logout')):
+            with self.subTest(name=name):
+                refresh = str(RefreshToken.for_user(self.create_user(phone_number=f'+99890765432{i}')))
+                self.post('refresh', refresh)
+                # Already blacklisted by the rotation, but the grace ends.
+                self.assertEqual(self.post(name, refresh).status_code, 400)
+                self.assertEqual(self.post('refresh', refresh).status_code, 401)
+
+    def test_blacklisted_token_is_refused(self):
+        RefreshToken(self.refresh).blacklist()
+        self.assertEqual(self.post('refresh', self.refresh).status_code, 401)
+
+    def test_inactive_or_deleted_user_is_refused(self):
+        user = self.create_user(phone_number='+998907654321')
+        refresh = str(RefreshToken.for_user(user))
+        UserModel.objects.filter(pk=user.pk).update(is_active=False)
+        self.assertEqual(self.post('refresh', refresh).status_code, 401)
+
+        # Deleting the user deletes its outstanding tokens too.
+        UserModel.objects.filter(pk=user.pk).delete()
+        self.assertEqual(self.post('refresh', refresh).status_code, 401)
+
+    def test_losing_the_race_gets_the_winners_pair(self):
+        cache = mock.Mock()
+        cache.add.return_value = False
+        winner = {'jti': 'winner', 'pair': {'access': 'a', 'refresh': 'r'}}
+        cache.get.return_value = winner
+        with mock.patch.dict('authentication.tokens.caches', {app_settings.REFRESH_GRACE_CACHE: cache}):
+            response = self.post('refresh', self.refresh)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), winner['pair'])
+
+    def test_losing_the_race_to_an_expired_entry_is_refused(self):
+        cache = mock.Mock()
+        cache.add.return_value = False
+        cache.get.return_value = None
+        with mock.patch.dict('authentication.tokens.caches', {app_settings.REFRESH_GRACE_CACHE: cache}):
+            self.assertEqual(self.post('refresh', self.refresh).status_code, 401)
+        self.assertFalse(BlacklistedToken.objects.exists())
+
+    def test_token_revoked_during_rotation_is_refused(self):
+        with mock.patch.object(RefreshToken, 'blacklist', return_value=(None, False)):
+            self.assertEqual(self.post('refresh', self.refresh).status_code, 401)
+        # The pair that was never handed out is dropped from the grace cache.
+        jti = RefreshToken(self.refresh)['jti']
+        self.assertIsNone(caches[app_settings.REFRESH_GRACE_CACHE].get(grace_key(jti)))
+
+    def test_invalid_token_is_refused(self):
+        self.assertEqual(self.post('refresh', 'not-a-token').status_code, 401)
+
+    def test_check_requires_a_shared_cache(self):
+        self.assertEqual(check_refresh_grace_cache(None), [])
+        with authentication_settings(REFRESH_GRACE_CACHE='default'):
+            self.assertEqual([error.id for error in check_refresh_grace_cache(None)], ['authentication.E002'])
+        with authentication_settings(REFRESH_GRACE_CACHE='missing'):
+            self.assertEqual([error.id for error in check_refresh_grace_cache(None)], ['authentication.E001'])
+
+
+class FindRegressionsTests(SimpleTestCase):
+    def load(self, errors=0, requests=1000, p95=10.0):
+        return {'load': {'login': {
+            'p50': 5.0, 'p95': p95, 'p99': 20.0, 'throughput': 100.0, 'requests': requests, 'errors': errors,
+        }}}
+
+    def test_unchanged_results_pass(self):
+        self.assertEqual(find_regressions(self.load(errors=1), self.load(errors=1), 0.1), [])
+
+    def test_slower_latency_beyond_the_threshold(self):
+        self.assertEqual(find_regressions(self.load(p95=10.5), self.load(), 0.1), [])
+        self.assertEqual(
+            find_regressions(self.load(p95=12.0), self.load(), 0.1), ['login p95: 12.00ms, baseline 10.00ms'],
+        )
+
+    def test_any_rise_in_errors(self):
+        self.assertEqual(
+            find_regressions(self.load(errors=1), self.load(), 0.5),
+            ['login errors: 1 (0.10%), baseline 0 (0.00%)'],
+        )
+        # Same count over fewer requests is a higher rate.
+        self.assertEqual(len(find_regressions(self.load(errors=2, requests=500), self.load(errors=2), 0.5)), 1)
+        # Baselines saved before errors were compared.
+        baseline = self.load()
+        del baseline['load']['login']['errors']
+        self.assertEqual(len(find_regressions(self.load(errors=1), baseline, 0.5)), 1)
+
+
+class MetricsTests(APITestCase):
+    def get_metrics(self, remote_addr, **headers):
+        return self.client.get(reverse('metrics'), REMOTE_ADDR=remote_addr, **headers)
+
+    def test_allowed_addresses_only(self):
+        response = self.get_metrics('127.0.0.1')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'# TYPE http_request_duration_seconds histogram', response.content)
+        self.assertEqual(self.get_metrics('10.0.0.1').status_code, 404)
+        with authentication_settings(METRICS_ALLOWED_IPS=None):
+            self.assertEqual(self.get_metrics('10.0.0.1').status_code, 200)
+
+    def test_forwarded_for_needs_trusted_proxies(self):
+        self.assertEqual(self.get_metrics('10.0.0.1', HTTP_X_FORWARDED_FOR='127.0.0.1').status_code, 404)
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'NUM_PROXIES': 1}):
+            self.assertEqual(self.get_metrics('10.0.0.1', HTTP_X_FORWARDED_FOR='127.0.0.1').status_code, 200)
+            # Only the address added by the trusted proxy counts.
+            forwarded = self.get_metrics('10.0.0.1', HTTP_X_FORWARDED_FOR='127.0.0.1, 203.0.113.5')
+            self.assertEqual(forwarded.status_code, 404)
+
+    def test_server_timing_header_is_opt_in(self):
+        headers = self.auth(self.create_user())
+        with authentication_settings(SERVER_TIMING_HEADER=False):
+            self.assertNotIn('Server-Timing', self.client.get(reverse('me'), **headers))
+        with authentication_settings(SERVER_TIMING_HEADER=True):
+            self.assertIn('total;dur=', self.client.get(reverse('me'), **headers)['Server-Timing'])
+
+
+class MiddlewareProfileTests(APITestCase):
+    def test_api_skips_the_browser_middleware(self):
+        user = self.create_user()
+        response = self.client.post(reverse('login'), {'phone_number': user.phone_number, 'password': PASSWORD})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.wsgi_request.path.startswith('/en/api/'))
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+        self.assertNotIn(settings.CSRF_COOKIE_NAME, response.cookies)
+        self.assertNotIn('X-Frame-Options', response)
+        self.assertFalse(hasattr(response.wsgi_request, 'session'))
+
+    def test_api_post_needs_no_csrf_token(self):
+        user = self.create_user()
+        client = Client(enforce_csrf_checks=True)
+        response = client.post(reverse('login'), {'phone_number': user.phone_number, 'password': PASSWORD})
+        self.assertEqual(response.status_code, 200)
+
+    def test_admin_and_swagger_keep_the_full_stack(self):
+        for url in (reverse('admin:login'), reverse('schema-swagger-ui')):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response['X-Frame-Options'], 'DENY')
+                self.assertTrue(hasattr(response.wsgi_request, 'session'))
+                self.assertTrue(hasattr(response.wsgi_request, 'user'))
+
+                response = Client(enforce_csrf_checks=True).post(url)
+                self.assertEqual(response.status_code, 403)
+
+        # Only the admin login form asks for a token, the swagger UI runs
+        # without session auth.
+        response = self.client.get(reverse('admin:login'))
+        self.assertIn(settings.CSRF_COOKIE_NAME, response.cookies)
+
+    def test_benchmark_requests_succeed(self):
+        def time_past_the_throttle(func, repeat):
+            for _ in range(400):
+                func()
+            return 1.0
+
+        with mock.patch('authentication.benchmarks.micro._time', side_effect=time_past_the_throttle):
+            results = run_middleware_comparison()
+        self.assertEqual(results, {'api_request_full_stack': 1.0, 'api_request_lean_stack': 1.0})
+
+        with mock.patch('authentication.benchmarks.micro.wsgi_request', return_value=429):
+            with self.assertRaisesMessage(RuntimeError, 'returned 429'):
+                run_middleware_comparison()
+
+
+class WarmUpTests(SimpleTestCase):
+    def test_warm_up(self):
+        self.assertGreater(warm_up(), 0)
+
+    def test_prepare_server(self):
+        for enabled in (True, False):
+            with self.subTest(enabled=enabled), authentication_settings(WARMUP_ON_STARTUP=enabled):
+                with mock.patch('authentication.warmup.warm_up') as warm, \
+                        mock.patch('authentication.warmup.build_filters') as build, \
+                        mock.patch('authentication.warmup.prestart_process_pool') as prestart:
+                    prepare_server()
+                self.assertEqual(warm.called, enabled)
+                self.assertEqual(build.called, enabled)
+                prestart.assert_called_once_with()
+
+
+class ExportTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.users = [
+            UserModel.objects.create(phone_number='+998901111111', country='Uzbekistan', is_verified=True),
+            UserModel.objects.create(phone_number='+79123456789', country='Russia'),
+            UserModel.objects.create(phone_number='+998902222222', country='Uzbekistan'),
+        ]
+        self.staff = self.create_user(phone_number='+998900000001', is_staff=True)
+
+    def ids(self, chunks):
+        return [json.loads(line)['id'] for line in ''.join(chunks).splitlines()]
+
+    def test_batches_are_id_windows(self):
+        queryset = export_queryset(country='Uzbekistan')
+        batches = list(iter_batches(queryset, batch_size=2))
+        self.assertEqual(
+            [[row[0] for row in batch] for batch in batches],
+            [[self.users[0].pk, self.users[2].pk], [self.staff.pk]],
+        )
+        self.assertEqual(len(batches[0][0]), len(EXPORT_FIELDS))
+
+        resumed = iter_batches(queryset, after_id=self.users[2].pk, batch_size=2)
+        self.assertEqual([row[0] for batch in resumed for row in batch], [self.staff.pk])
+
+    def test_filters(self):
+        all_users = [user.pk for user in self.users] + [self.staff.pk]
+        self.assertEqual(self.ids(export_users('ndjson')), sorted(all_users))
+        self.assertEqual(self.ids(export_users('ndjson', country='Russia')), [self.users[1].pk])
+        self.assertEqual(self.ids(export_users('ndjson', is_verified=True)), [self.users[0].pk])
+
+        UserModel.objects.filter(pk=self.users[0].pk).update(created_at=datetime(2024, 1, 1, tzinfo=dt_timezone.utc))
+        boundary = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+        self.assertEqual(self.ids(export_users('ndjson', created_before=boundary)), [self.users[0].pk])
+        self.assertNotIn(self.users[0].pk, self.ids(export_users('ndjson', created_after=boundary)))
+
+    def test_csv(self):
+        rows = list(csv.reader(''.join(export_users('csv', batch_size=2)).splitlines()))
+        self.assertEqual(rows[0], list(EXPORT_FIELDS))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[1][:3], [str(self.users[0].pk), '+998901111111', 'Uzbekistan'])
+        # An empty export is the header alone.
+        self.assertEqual(list(export_users('csv', country='USA')), [','.join(EXPORT_FIELDS) + '\r\n'])
+
+    def test_command(self):
+        stdout = StringIO()
+        call_command('export_users', format='ndjson', country='Russia', stdout=stdout)
+        self.assertEqual(self.ids([stdout.getvalue()]), [self.users[1].pk])
+
+        for options in ({'country': 'Atlantis'}, {'after': -1}, {'created_after': 'yesterday'}):
+            with self.subTest(options=options), self.assertRaises(CommandError):
+                call_command('export_users', stdout=StringIO(), **options)
+
+    def test_endpoint(self):
+        url = reverse('users-export')
+        self.assertEqual(self.client.get(url, **self.auth(self.users[0])).status_code, 403)
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+        response = self.client.get(url, {'output': 'ndjson', 'country': 'Russia'}, **self.auth(self.staff))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="users.ndjson"')
+        self.assertEqual(self.ids(chunk.decode() for chunk in response.streaming_content), [self.users[1].pk])
+
+        response = self.client.get(url, {'output': 'xml'}, **self.auth(self.staff))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('output', response.json())
+
+
+class ProfileETagTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user()
+        self.headers = self.auth(self.user)
+        self.url = reverse('me')
+
+    def get(self, **headers):
+        return self.client.get(self.url, **self.headers, **headers)
+
+    def patch(self, data, **headers):
+        return self.client.patch(self.url, data, content_type='application/json', **self.headers, **headers)
+
+    def test_if_none_match_is_weak(self):
+        etag = self.get()['ETag']
+        for header in (etag, f'W/{etag}', f'"other", {etag}', '*'):
+            with self.subTest(header=header):
+                response = self.get(HTTP_IF_NONE_MATCH=header)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['ETag'], etag)
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+
+    def test_if_match_is_strong(self):
+        etag = self.get()['ETag']
+        for header in (f'W/{etag}', '"other"'):
+            with self.subTest(header=header):
+                self.assertEqual(self.patch({'country': 'Russia'}, HTTP_IF_MATCH=header).status_code, 412)
+
+        response = self.patch({'country': 'Russia'}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        # The old tag is stale now.
+        self.assertEqual(self.patch({'country': 'USA'}, HTTP_IF_MATCH=etag).status_code, 412)
+        self.assertEqual(self.patch({'country': 'USA'}, HTTP_IF_MATCH='*').status_code, 200)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.country, 'USA')
+
+    def test_invalid_and_unauthenticated(self):
+        self.assertEqual(self.patch({'country': 'Atlantis'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+        self.assertEqual(self.client.patch(self.url, {}, content_type='application/json').status_code, 401)
+
+
+@authentication_settings(DATABASE_REPLICAS=[REPLICA_ALIAS])
+class ProfileETagReplicaTests(APITestCase):
+    databases = {'default', REPLICA_ALIAS}
+
+    def test_patch_reads_the_primary(self):
+        user = self.create_user()
+        stale = UserModel.objects.using(REPLICA_ALIAS).create(id=user.pk, phone_number=user.phone_number)
+        UserModel.objects.using(REPLICA_ALIAS).filter(pk=stale.pk).update(updated_at=user.updated_at - timedelta(minutes=1))
+
+        response = self.client.patch(
+            reverse('me'), {'country': 'Russia'}, content_type='application/json',
+            HTTP_IF_MATCH=profile_etag(user), **self.auth(user),
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+class SchemaTests(SimpleTestCase):
+    def setUp(self):
+        schema.clear_schema_cache()
+        self.addCleanup(schema.clear_schema_cache)
+        patcher = mock.patch.object(schema, 'generate_schema', wraps=schema.generate_schema)
+        self.generate = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_schema_is_generated_once_and_revalidated_by_etag(self):
+        first = self.client.get(reverse('schema-json'))
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('paths', json.loads(first.content))
+        self.assertIn('max-age=', first['Cache-Control'])
+
+        again = self.client.get(reverse('schema-json'), HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again['ETag'], first['ETag'])
+        self.assertEqual(self.generate.call_count, 1)
+
+    def test_gzip_variant(self):
+        plain = self.client.get(reverse('schema-json'))
+        zipped = self.client.get(reverse('schema-json'), HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(zipped['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(zipped.content), plain.content)
+        self.assertNotEqual(zipped['ETag'], plain['ETag'])
+        self.assertIn('Accept-Encoding', zipped['Vary'])
+        # The plain tag doesn't validate the gzip variant.
+        response = self.client.get(
+            reverse('schema-json'), HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=plain['ETag'],
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_swagger_ui_never_generates_the_schema(self):
+        for _ in range(3):
+            response = self.client.get(reverse('schema-swagger-ui'))
+            self.assertEqual(response.status_code, 200)
+        self.assertContains(response, f'"url": "{reverse("schema-json")}"')
+        self.assertEqual(self.generate.call_count, 0)
+
+        for _ in range(2):
+            response = self.client.get(reverse('schema-swagger-ui'), {'format': 'openapi'})
+            self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(self.generate.call_count, 1)
+
+    def test_generate_schema_command_output_is_served(self):
+        with TemporaryDirectory() as schema_dir:
+            stdout = StringIO()
+            call_command('generate_schema', output_dir=schema_dir, formats=['json'], stdout=stdout)
+            for language, _ in settings.LANGUAGES:
+                self.assertTrue((Path(schema_dir) / schema.schema_filename(language, 'json')).is_file())
+            self.assertFalse((Path(schema_dir) / schema.schema_filename('en', 'yaml')).exists())
+
+            path = Path(schema_dir) / schema.schema_filename('en', 'json')
+            path.write_bytes(b'{"from": "disk"}')
+            self.generate.reset_mock()
+            with authentication_settings(SCHEMA_DIR=schema_dir):
+                response = self.client.get(reverse('schema-json'))
+            self.assertEqual(response.content, b'{"from": "disk"}')
+            self.assertEqual(self.generate.call_count, 0)
+
+    def test_generate_schema_command_needs_a_directory(self):
+        with authentication_settings(SCHEMA_DIR=None), self.assertRaises(CommandError):
+            call_command('generate_schema', stdout=StringIO())
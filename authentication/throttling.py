@@ -0,0 +1,116 @@
+from abc import ABC, abstractmethod
+from types import SimpleNamespace
+
+from django.core.cache import caches
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+from authentication.conf import app_settings
+from authentication.phone import normalize
+
+
+class ScopedKeyThrottle(SimpleRateThrottle, ABC):
+    """
+    Sliding-window throttle whose rate is looked up as
+    '<view.throttle_scope>_<key_name>' in DEFAULT_THROTTLE_RATES.
+
+    Views without a throttle_scope, and scopes without a configured rate,
+    are not throttled. History is kept in the cache named by the
+    THROTTLE_CACHE setting.
+    """
+    key_name = None
+
+    def __init__(self):
+        # The rate depends on the view, so it is resolved in allow_request.
+        pass
+
+    @property
+    def cache(self):
+        return caches[app_settings.THROTTLE_CACHE]
+
+    @abstractmethod
+    def get_ident_value(self, request):
+        """The client identity to count requests for, None to skip the throttle"""
+
+    def get_cache_key(self, request, view):
+        ident = self.get_ident_value(request)
+        if not ident:
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+    def _resolve_rate(self, view):
+        """Look up the rate for view, returns False when it is not throttled"""
+        throttle_scope = getattr(view, 'throttle_scope', None)
+        if not throttle_scope:
+            return False
+
+        self.scope = f'{throttle_scope}_{self.key_name}'
+        self.rate = api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        return self.rate is not None
+
+    def allow_request(self, request, view):
+        if not self._resolve_rate(view):
+            return True
+        return super().allow_request(request, view)
+
+    async def aallow_request(self, request, view):
+        """allow_request() on the async cache API, for the async views"""
+        if not self._resolve_rate(view):
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.history = await self.cache.aget(self.key, [])
+        self.now = self.timer()
+        while self.history and self.history[-1] <= self.now - self.duration:
+            self.history.pop()
+        if len(self.history) >= self.num_requests:
+            return self.throttle_failure()
+
+        self.history.insert(0, self.now)
+        await self.cache.aset(self.key, self.history, self.duration)
+        return True
+
+
+class IPRateThrottle(ScopedKeyThrottle):
+    """
+    Limits requests per client IP address.
+    """
+    key_name = 'ip'
+
+    def get_ident_value(self, request):
+        return self.get_ident(request)
+
+
+class PhoneNumberRateThrottle(ScopedKeyThrottle):
+    """
+    Limits requests per normalized phone number in the request body.
+    """
+    key_name = 'phone'
+
+    def get_ident_value(self, request):
+        data = request.data if hasattr(request, 'data') else request.POST
+        phone_number = data.get('phone_number')
+        if not isinstance(phone_number, str):
+            return None
+        return normalize(phone_number.strip())
+
+
+async def athrottle_wait(request, scope):
+    """
+    Apply the IP and phone number throttles outside of a DRF view, for the
+    async views.
+
+    Returns None when the request is allowed, otherwise the number of
+    seconds the client should wait.
+    """
+    view = SimpleNamespace(throttle_scope=scope)
+    waits = []
+    for throttle in (IPRateThrottle(), PhoneNumberRateThrottle()):
+        if not await throttle.aallow_request(request, view):
+            waits.append(throttle.wait())
+    if not waits:
+        return None
+    return max((wait for wait in waits if wait is not None), default=0)
@@ -0,0 +1,150 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.tokens import BlacklistMixin, RefreshToken as BaseRefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from authentication.conf import app_settings
+from authentication.metrics import timed
+from authentication.revocation import revocation_cache
+from authentication.writebehind import outstanding_token_buffer
+
+# User attributes embedded in tokens when CLAIMS_ONLY_USER is enabled.
+USER_CLAIMS = ('is_verified', 'country', 'is_staff', 'is_superuser')
+
+
+class RefreshToken(BaseRefreshToken):
+    """
+    Refresh token that answers blacklist checks from the revocation cache
+    and can carry the user claims read by ClaimsUser.
+    """
+
+    @classmethod
+    @timed('token')
+    def for_user(cls, user):
+        token = cls.issue(user)
+        token.record(user)
+        return token
+
+    @classmethod
+    def issue(cls, user):
+        """A new token for user that is not recorded as outstanding yet"""
+        # Token.for_user, skipping BlacklistMixin.for_user so the claims are
+        # in place before the outstanding row is written.
+        token = super(BlacklistMixin, cls).for_user(user)
+        token.add_user_claims(user)
+        return token
+
+    def record(self, user):
+        """Queue the outstanding row, or write it now if the buffer is disabled"""
+        outstanding_token_buffer.add(self[api_settings.JTI_CLAIM], self.outstanding_fields(user))
+
+    def blacklist(self):
+        # The outstanding row may still be waiting in this process' buffer.
+        pending = outstanding_token_buffer.pop(self[api_settings.JTI_CLAIM])
+        if pending is not None:
+            outstanding_token_buffer.write({self[api_settings.JTI_CLAIM]: pending})
+        return super().blacklist()
+
+    def add_user_claims(self, user):
+        if app_settings.CLAIMS_ONLY_USER:
+            for claim in USER_CLAIMS:
+                self[claim] = getattr(user, claim)
+
+    def outstanding_fields(self, user):
+        return {
+            'user': user,
+            'jti': self[api_settings.JTI_CLAIM],
+            'token': str(self),
+            'created_at': self.current_time,
+            'expires_at': datetime_from_epoch(self['exp']),
+        }
+
+    def check_blacklist(self):
+        if not app_settings.REVOCATION_CACHE_ENABLED:
+            return super().check_blacklist()
+
+        if revocation_cache.is_revoked(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+
+class _UncheckedRefreshToken(RefreshToken):
+    def check_blacklist(self):
+        # Checked by refresh_tokens() before the grace cache is tried.
+        pass
+
+
+def grace_key(jti):
+    return f'refresh-grace:{jti}'
+
+
+def _is_revoked(jti):
+    if app_settings.REVOCATION_CACHE_ENABLED:
+        return revocation_cache.is_revoked(jti)
+    return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+
+def forget_rotation(raw_token):
+    """
+    Stop handing out the pair a refresh token was rotated into, called on
+    logout before the blacklist check so a rotated token ends its grace
+    period too.
+    """
+    token = _UncheckedRefreshToken(raw_token)
+    caches[app_settings.REFRESH_GRACE_CACHE].delete(grace_key(token[api_settings.JTI_CLAIM]))
+
+
+def refresh_tokens(raw_token):
+    """
+    Exchange a refresh token for {'access'}, or for {'access', 'refresh'}
+    when ROTATE_REFRESH_TOKENS is on.
+
+    Concurrent refreshes of the same token race on cache.add(): the
+    winner blacklists the old token and records the new one, the others
+    get the winner's pair. Retries of the rotated, and so blacklisted,
+    token within REFRESH_GRACE_PERIOD seconds get the same pair too, as
+    long as neither token has been logged out. Raises TokenError when the
+    token can't be used.
+    """
+    token = _UncheckedRefreshToken(raw_token)
+    cache = caches[app_settings.REFRESH_GRACE_CACHE]
+    key = grace_key(token[api_settings.JTI_CLAIM])
+    try:
+        RefreshToken.check_blacklist(token)
+    except TokenError:
+        grace = cache.get(key)
+        if grace is None or _is_revoked(grace['jti']):
+            raise
+        return grace['pair']
+
+    User = get_user_model()
+    user = User.objects.filter(
+        **{api_settings.USER_ID_FIELD: token.get(api_settings.USER_ID_CLAIM)}
+    ).first()
+    if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+        raise TokenError(_("No active account found for the given token."))
+
+    if not api_settings.ROTATE_REFRESH_TOKENS:
+        return {'access': str(token.access_token)}
+
+    new_token = RefreshToken.issue(user)
+    pair = {'access': str(new_token.access_token), 'refresh': str(new_token)}
+    grace = {'jti': new_token[api_settings.JTI_CLAIM], 'pair': pair}
+    if not cache.add(key, grace, app_settings.REFRESH_GRACE_PERIOD):
+        grace = cache.get(key)
+        if grace is None:
+            raise TokenError(_("Token is blacklisted"))
+        return grace['pair']
+
+    if api_settings.BLACKLIST_AFTER_ROTATION:
+        _blacklisted, created = token.blacklist()
+        if not created:
+            # Revoked meanwhile, or rotated by a process that doesn't
+            # share the grace cache.
+            cache.delete(key)
+            raise TokenError(_("Token is blacklisted"))
+    new_token.record(user)
+    return pair
@@ -1,9 +1,27 @@
 from django.urls import path
 
-from authentication.views import RegisterViewSet, LoginViewSet, LogoutViewSet
+from authentication import async_views
+from authentication.views import (
+    RegisterViewSet,
+    BatchRegisterViewSet,
+    UserExportViewSet,
+    PhoneAvailabilityViewSet,
+    LoginViewSet,
+    RefreshViewSet,
+    LogoutViewSet,
+    MeViewSet,
+)
 
 urlpatterns = [
     path('register/', RegisterViewSet.as_view({'post': 'register'}), name='register'),
+    path('register/batch/', BatchRegisterViewSet.as_view({'post': 'register'}), name='register-batch'),
+    path('users/export/', UserExportViewSet.as_view({'get': 'export'}), name='users-export'),
+    path('phone/available/', PhoneAvailabilityViewSet.as_view({'get': 'check'}), name='phone-available'),
     path('login/', LoginViewSet.as_view({'post': 'login'}), name='login'),
+    path('refresh/', RefreshViewSet.as_view({'post': 'refresh'}), name='refresh'),
     path('logout/', LogoutViewSet.as_view({'post': 'logout'}), name='logout'),
+    path('me/', MeViewSet.as_view({'get': 'retrieve', 'patch': 'partial_update'}), name='me'),
+    path('async/register/', async_views.register, name='async-register'),
+    path('async/login/', async_views.login, name='async-login'),
+    path('async/logout/', async_views.logout, name='async-logout'),
 ]
@@ -1,34 +1,23 @@
 from django.core.exceptions import ValidationError
-import re
+
+from authentication.phone import INVALID_FORMAT_MESSAGE, classify, classify_many, country_for_prefix
 
 
 def validate_phone_number(value):
-    patterns = {
-        'Uzbekistan': r'^\+998\d{9}$',
-        'Russia': r'^\+7\d{10}$',
-        'USA': r'^\+1\d{10}$'
-    }
-    for country, pattern in patterns.items():
-        if re.fullmatch(pattern, value):
-            return
-
-    raise ValidationError(
-        "Invalid phone number format. Valid formats: "
-        "Uzbekistan: +998901234567, "
-        "Russia: +79123456789, "
-        "USA: +11234567890"
-    )
+    if classify(value) is None:
+        raise ValidationError(INVALID_FORMAT_MESSAGE)
+
+
+def validate_phone_numbers(values):
+    """Return the numbers that are not valid, for validating large imports"""
+    values = list(values)
+    return [value for value, country in zip(values, classify_many(values)) if country is None]
 
 
 def get_country_from_phone(phone_number):
     """Determine country from phone number"""
-    if phone_number.startswith('+998'):
-        return 'Uzbekistan'
-    elif phone_number.startswith('+7'):
-        return 'Russia'
-    elif phone_number.startswith('+1'):
-        return 'USA'
-    return None
+    country = country_for_prefix(phone_number)
+    return country.name if country else None
 
 
 def validate_password_uppercase(value):
@@ -1,15 +1,44 @@
-from rest_framework.permissions import AllowAny, IsAuthenticated
+import hashlib
+
+from django.http import HttpResponseNotModified, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags, quote_etag
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.viewsets import ViewSet
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework_simplejwt.tokens import RefreshToken
-from drf_yasg.utils import swagger_auto_schema
-from drf_yasg import openapi
-from rest_framework.parsers import MultiPartParser, FormParser
-from authentication.models import COUNTRY_CHOICES
+from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
+from authentication.authentication import ClaimsUser
+from authentication.batch import register_batch
+from authentication.conf import app_settings
+from authentication.export import FORMATS, export_users
+from authentication.models import UserModel
+from authentication.parsers import NDJSONParser
+from authentication.phone import INVALID_FORMAT_MESSAGE, classify, normalize
+from authentication.registry import phone_registry
+from authentication.renderers import json_response, registered_user, user_profile
+from authentication.routers import ReplicaRouter
+from authentication.schemas import (
+    lazy_swagger_auto_schema,
+    register_operation,
+    batch_register_operation,
+    user_export_operation,
+    phone_availability_operation,
+    login_operation,
+    refresh_operation,
+    logout_operation,
+    me_operation,
+    me_update_operation,
+)
+from authentication.throttling import IPRateThrottle, PhoneNumberRateThrottle
+from authentication.tokens import RefreshToken, forget_rotation, refresh_tokens
+from authentication.writebehind import last_login_buffer
 from authentication.serializers import (
     RegisterSerializer,
     LoginSerializer,
+    UserExportSerializer,
     UserProfileSerializer,
 )
 from rest_framework_simplejwt.exceptions import TokenError
@@ -18,101 +47,18 @@ from rest_framework_simplejwt.exceptions import TokenError
 class RegisterViewSet(ViewSet):
     permission_classes = [AllowAny]
     parser_classes = [MultiPartParser, FormParser]  # Support form data
+    throttle_classes = [IPRateThrottle, PhoneNumberRateThrottle]
+    throttle_scope = 'register'
 
-    @swagger_auto_schema(
-        operation_summary="Register User",
-        operation_description="Register a new user with phone number, password, and country using form data. The country field is a dropdown based on predefined choices.",
-        manual_parameters=[
-            openapi.Parameter(
-                name='phone_number',
-                in_=openapi.IN_FORM,
-                type=openapi.TYPE_STRING,
-                required=True,
-                description="User's phone number (e.g., +998901234567)",
-                max_length=30,
-                example="+998901234567"
-            ),
-            openapi.Parameter(
-                name='password',
-                in_=openapi.IN_FORM,
-                type=openapi.TYPE_STRING,
-                required=True,
-                description="Password (minimum 8 characters, must include at least one uppercase letter)",
-                min_length=8,
-                format='password'
-            ),
-            openapi.Parameter(
-                name='password_confirm',
-                in_=openapi.IN_FORM,
-                type=openapi.TYPE_STRING,
-                required=True,
-                description="Must match the password field",
-                format='password'
-            ),
-            openapi.Parameter(
-                name='country',
-                in_=openapi.IN_FORM,
-                type=openapi.TYPE_STRING,
-                required=True,
-                description="User's country (select from dropdown)",
-                enum=[choice[0] for choice in COUNTRY_CHOICES],
-                default="Uzbekistan",
-                example="Uzbekistan"
-            ),
-        ],
-        consumes=['multipart/form-data', 'application/x-www-form-urlencoded'],
-        responses={
-            201: openapi.Response(
-                description="User registered successfully",
-                schema=openapi.Schema(
-                    type=openapi.TYPE_OBJECT,
-                    properties={
-                        'message': openapi.Schema(type=openapi.TYPE_STRING, example="User registered successfully"),
-                        'user_info': openapi.Schema(
-                            type=openapi.TYPE_OBJECT,
-                            properties={
-                                'phone_number': openapi.Schema(type=openapi.TYPE_STRING, example="+998901234567"),
-                                'country': openapi.Schema(
-                                    type=openapi.TYPE_STRING,
-                                    enum=[choice[0] for choice in COUNTRY_CHOICES],
-                                    example="Uzbekistan"
-                                ),
-                            }
-                        )
-                    }
-                ),
-                examples={
-                    "application/json": {
-                        "message": "User registered successfully",
-                        "user_info": {
-                            "phone_number": "+998901234567",
-                            "country": "Uzbekistan"
-                        }
-                    }
-                }
-            ),
-            400: openapi.Response(
-                description="Bad Request",
-                examples={
-                    "application/json": {
-                        "phone_number": ["This field is required."],
-                        "password": ["Password must be at least 8 characters."],
-                        "password_confirm": ["Passwords do not match."],
-                        "country": ["Invalid choice."]
-                    }
-                }
-            )
-        },
-        tags=['Authentication'],
-    )
+    @lazy_swagger_auto_schema(register_operation)
     def register(self, request):
         serializer = RegisterSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save()
-            return Response(
+            user = serializer.save()
+            return json_response(
                 {
                     "message": "User registered successfully",
-                    "user_info": serializer.data
+                    "user_info": registered_user(user)
                 },
                 status=status.HTTP_201_CREATED
             )
@@ -122,148 +68,143 @@ class RegisterViewSet(ViewSet):
         )
 
 
+class BatchRegisterViewSet(ViewSet):
+    permission_classes = [IsAdminUser]
+    parser_classes = [JSONParser, NDJSONParser]
+
+    @lazy_swagger_auto_schema(batch_register_operation)
+    def register(self, request):
+        rows = request.data
+        if not isinstance(rows, list):
+            return Response(
+                {"detail": ["Expected a list of users."]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        max_rows = app_settings.BATCH_REGISTER_MAX_ROWS
+        if len(rows) > max_rows:
+            return Response(
+                {"detail": [f"A batch may contain at most {max_rows} users."]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        results = register_batch(rows)
+        created = sum(1 for result in results if result['status'] == 'created')
+        return Response(
+            {
+                "created": created,
+                "failed": len(results) - created,
+                "results": results
+            },
+            status=status.HTTP_200_OK
+        )
+
+
+class UserExportViewSet(ViewSet):
+    permission_classes = [IsAdminUser]
+
+    @lazy_swagger_auto_schema(user_export_operation)
+    def export(self, request):
+        # A plain dict, so missing booleans stay missing instead of False.
+        serializer = UserExportSerializer(data=request.query_params.dict())
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        options = dict(serializer.validated_data)
+        output_format = options.pop('output')
+        after_id = options.pop('after')
+        _, content_type, extension = FORMATS[output_format]
+        response = StreamingHttpResponse(
+            export_users(output_format, after_id=after_id, **options),
+            content_type=content_type
+        )
+        response['Content-Disposition'] = f'attachment; filename="users.{extension}"'
+        return response
+
+
+class PhoneAvailabilityViewSet(ViewSet):
+    permission_classes = [AllowAny]
+    throttle_classes = [IPRateThrottle]
+    throttle_scope = 'availability'
+
+    @lazy_swagger_auto_schema(phone_availability_operation)
+    def check(self, request):
+        phone_number = request.query_params.get('phone_number')
+        if not phone_number:
+            return Response(
+                {"phone_number": ["This field is required."]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        phone_number = normalize(phone_number.strip())
+        if classify(phone_number) is None:
+            return Response(
+                {"phone_number": [INVALID_FORMAT_MESSAGE]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return json_response(
+            {
+                "phone_number": phone_number,
+                "available": not phone_registry.is_registered(phone_number)
+            },
+            status=status.HTTP_200_OK
+        )
+
+
 class LoginViewSet(ViewSet):
     permission_classes = [AllowAny]
     parser_classes = [MultiPartParser, FormParser]  # Support form data
+    throttle_classes = [IPRateThrottle, PhoneNumberRateThrottle]
+    throttle_scope = 'login'
 
-    @swagger_auto_schema(
-        operation_summary="Login User",
-        operation_description="Authenticate a user with phone number and password using form data. Returns access and refresh tokens along with user details.",
-        manual_parameters=[
-            openapi.Parameter(
-                name='phone_number',
-                in_=openapi.IN_FORM,
-                type=openapi.TYPE_STRING,
-                required=True,
-                description="User's phone number (e.g., +998901234567)",
-                max_length=30,
-                example="+998901234567"
-            ),
-            openapi.Parameter(
-                name='password',
-                in_=openapi.IN_FORM,
-                type=openapi.TYPE_STRING,
-                required=True,
-                description="User's password",
-                format='password'
-            ),
-        ],
-        consumes=['multipart/form-data', 'application/x-www-form-urlencoded'],
-        responses={
-            200: openapi.Response(
-                description="User logged in successfully",
-                schema=openapi.Schema(
-                    type=openapi.TYPE_OBJECT,
-                    properties={
-                        'access': openapi.Schema(type=openapi.TYPE_STRING, description="JWT access token",
-                                                 example="eyJ0eXAiOiJKV1QiLCJhbGciOiJIUzI1NiJ9..."),
-                        'refresh': openapi.Schema(type=openapi.TYPE_STRING, description="JWT refresh token",
-                                                  example="eyJ0eXAiOiJKV1QiLCJhbGciOiJIUzI1NiJ9..."),
-                        'user': openapi.Schema(
-                            type=openapi.TYPE_OBJECT,
-                            properties={
-                                'phone_number': openapi.Schema(type=openapi.TYPE_STRING, example="+998901234567"),
-                                'country': openapi.Schema(type=openapi.TYPE_STRING, example="UZ"),
-                            }
-                        )
-                    }
-                ),
-                examples={
-                    "application/json": {
-                        "access": "eyJ0eXAiOiJKV1QiLCJhbGciOiJIUzI1NiJ9...",
-                        "refresh": "eyJ0eXAiOiJKV1QiLCJhbGciOiJIUzI1NiJ9...",
-                        "user": {
-                            "phone_number": "+998901234567",
-                            "country": "UZ"
-                        }
-                    }
-                }
-            ),
-            400: openapi.Response(
-                description="Bad Request",
-                examples={
-                    "application/json": {
-                        "phone_number": ["This field is required."],
-                        "password": ["This field is required."]
-                    }
-                }
-            )
-        },
-        tags=['Authentication'],
-    )
+    @lazy_swagger_auto_schema(login_operation)
     def login(self, request):
         serializer = LoginSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
             user = serializer.validated_data['user']
             refresh = RefreshToken.for_user(user)
 
-            user.save(update_fields=['last_login'])
+            user.last_login = timezone.now()
+            last_login_buffer.add(user.pk, user.last_login)
 
-            return Response(
+            return json_response(
                 {
                     'access': str(refresh.access_token),
                     'refresh': str(refresh),
-                    'user': UserProfileSerializer(user).data
+                    'user': user_profile(user)
                 },
                 status=status.HTTP_200_OK
             )
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class LogoutViewSet(ViewSet):
+class RefreshViewSet(ViewSet):
     permission_classes = [AllowAny]
     parser_classes = [MultiPartParser, FormParser]
+    throttle_classes = [IPRateThrottle]
+    throttle_scope = 'refresh'
 
-    @swagger_auto_schema(
-        operation_summary="Logout User",
-        operation_description="Log out an authenticated user by blacklisting the provided refresh token using form data. Requires a valid JWT access token in the Authorization header (Bearer <access_token>).",
-        manual_parameters=[
-            openapi.Parameter(
-                name='refresh',
-                in_=openapi.IN_FORM,
-                type=openapi.TYPE_STRING,
-                required=True,
-                description="The refresh token to blacklist for logout",
-                example="eyJ0eXAiOiJKV1QiLCJhbGciOiJIUzI1NiJ9..."
-            ),
-        ],
-        security=[{'Bearer': []}],
-        consumes=['multipart/form-data', 'application/x-www-form-urlencoded'],
-        responses={
-            200: openapi.Response(
-                description="User logged out successfully",
-                schema=openapi.Schema(
-                    type=openapi.TYPE_OBJECT,
-                    properties={
-                        'message': openapi.Schema(type=openapi.TYPE_STRING, example="User logged out successfully")
-                    }
-                ),
-                examples={
-                    "application/json": {
-                        "message": "User logged out successfully"
-                    }
-                }
-            ),
-            400: openapi.Response(
-                description="Bad Request",
-                examples={
-                    "application/json": {
-                        "refresh": ["This field is required."],
-                        "detail": ["Invalid token."]
-                    }
-                }
-            ),
-            401: openapi.Response(
-                description="Unauthorized - Authentication credentials were not provided or are invalid",
-                examples={
-                    "application/json": {
-                        "detail": "Authentication credentials were not provided."
-                    }
-                }
+    @lazy_swagger_auto_schema(refresh_operation)
+    def refresh(self, request):
+        refresh_token = request.data.get('refresh')
+        if not refresh_token:
+            return Response(
+                {"refresh": ["This field is required."]},
+                status=status.HTTP_400_BAD_REQUEST
             )
-        },
-        tags=['Authentication'],
-    )
+        try:
+            tokens = refresh_tokens(refresh_token)
+        except TokenError:
+            return Response(
+                {"detail": ["Invalid token."]},
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+        return json_response(tokens, status=status.HTTP_200_OK)
+
+
+class LogoutViewSet(ViewSet):
+    permission_classes = [AllowAny]
+    parser_classes = [MultiPartParser, FormParser]
+
+    @lazy_swagger_auto_schema(logout_operation)
     def logout(self, request):
         try:
             refresh_token = request.data.get('refresh')
@@ -272,6 +213,7 @@ class LogoutViewSet(ViewSet):
                     {"refresh": ["This field is required."]},
                     status=status.HTTP_400_BAD_REQUEST
                 )
+            forget_rotation(refresh_token)
             token = RefreshToken(refresh_token)
             token.blacklist()
             return Response(
@@ -282,4 +224,85 @@ class LogoutViewSet(ViewSet):
             return Response(
                 {"detail": ["Invalid token."]},
                 status=status.HTTP_400_BAD_REQUEST
-            )
\ No newline at end of file
+            )
+
+
+def profile_etag(user):
+    digest = hashlib.blake2b(f'{user.pk}:{user.updated_at.isoformat()}'.encode(), digest_size=8)
+    return quote_etag(digest.hexdigest())
+
+
+def _etag_matches(header, etag, weak):
+    """
+    Compare etag with an If-None-Match header, weak, or an If-Match
+    header, strong: weak tags never match it (RFC 9110, 13.1.1).
+    """
+    etags = parse_etags(header)
+    if '*' in etags:
+        return True
+    if weak:
+        return etag.removeprefix('W/') in [tag.removeprefix('W/') for tag in etags]
+    return not etag.startswith('W/') and etag in etags
+
+
+class MeViewSet(ViewSet):
+    """
+    The profile of the authenticated user. Responses carry an ETag
+    derived from the user id and updated_at: GET with a matching
+    If-None-Match returns 304 without serializing, and PATCH with an
+    If-Match that no longer matches returns 412 instead of overwriting
+    a newer change. PATCH reads the row from the primary, a lagging
+    replica would fail the If-Match of a client that saw a newer version.
+    """
+    permission_classes = [IsAuthenticated]
+    parser_classes = [JSONParser, MultiPartParser, FormParser]
+
+    def _user(self, request):
+        # ClaimsUser has no updated_at claim, load the row once.
+        user = request.user
+        return user.instance if isinstance(user, ClaimsUser) else user
+
+    def _profile_response(self, user, response=None):
+        if response is None:
+            response = json_response(user_profile(user), status=status.HTTP_200_OK)
+        response['ETag'] = profile_etag(user)
+        # The profile depends on the Authorization header.
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    @lazy_swagger_auto_schema(me_operation)
+    def retrieve(self, request):
+        user = self._user(request)
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match and _etag_matches(if_none_match, profile_etag(user), weak=True):
+            return self._profile_response(user, HttpResponseNotModified())
+        return self._profile_response(user)
+
+    @lazy_swagger_auto_schema(me_update_operation)
+    def partial_update(self, request):
+        user = get_object_or_404(UserModel.objects.using(ReplicaRouter.primary), pk=request.user.pk)
+        if_match = request.headers.get('If-Match')
+        if if_match and not _etag_matches(if_match, profile_etag(user), weak=False):
+            return Response(
+                {"detail": ["The profile was modified, fetch it again."]},
+                status=status.HTTP_412_PRECONDITION_FAILED
+            )
+
+        serializer = UserProfileSerializer(user, data=request.data, partial=True)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        if serializer.validated_data:
+            changes = {**serializer.validated_data, 'updated_at': timezone.now()}
+            rows = UserModel.objects.filter(pk=user.pk)
+            if if_match:
+                # Only if nobody saved the profile since it was read.
+                rows = rows.filter(updated_at=user.updated_at)
+            if not rows.update(**changes) and if_match:
+                return Response(
+                    {"detail": ["The profile was modified, fetch it again."]},
+                    status=status.HTTP_412_PRECONDITION_FAILED
+                )
+            for field, value in changes.items():
+                setattr(user, field, value)
+        return self._profile_response(user)
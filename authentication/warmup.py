@@ -0,0 +1,74 @@
+"""
+Hot-path state built once when a server process starts.
+
+config.wsgi and config.asgi, which runserver loads as well, call
+prepare_server() once the application is loaded; management commands
+never do. With a preloading server (e.g. gunicorn --preload) this runs in
+the master before it forks, so every worker shares the result
+copy-on-write instead of building it on its first requests. warm_up()
+doesn't touch the database or start threads or processes; build_filters()
+reads the bloom filters and closes its connections before any fork.
+"""
+import logging
+import time
+
+from django.contrib.auth.hashers import get_hashers
+from django.contrib.auth.password_validation import get_default_password_validators
+from django.db import DatabaseError, connections
+from django.urls import get_resolver
+
+from authentication.conf import app_settings
+from authentication.hashing import prestart_process_pool
+
+logger = logging.getLogger(__name__)
+
+
+def warm_up():
+    """Prepare the hot-path state, returns the seconds it took"""
+    from authentication.renderers import registered_user, user_profile
+    from authentication.serializers import LoginSerializer, RegisterSerializer
+    from rest_framework_simplejwt.state import token_backend
+
+    started = time.perf_counter()
+    get_hashers()
+    # CommonPasswordValidator reads its gzipped list of 20k passwords here.
+    get_default_password_validators()
+    # Imports the URLconf and every view, and compiles the URL patterns.
+    get_resolver().reverse_dict
+    for serializer_class in (RegisterSerializer, LoginSerializer):
+        serializer_class().fields
+    for representation in (user_profile, registered_user):
+        representation.prepare()
+    token_backend.get_leeway()
+
+    elapsed = time.perf_counter() - started
+    logger.info('Authentication warm-up took %.1f ms', elapsed * 1000)
+    return elapsed
+
+
+def build_filters():
+    """Build the phone registry and revocation filters, returns the seconds it took"""
+    from authentication.registry import phone_registry
+    from authentication.revocation import revocation_cache
+
+    started = time.perf_counter()
+    try:
+        for bloom_filter in (phone_registry, revocation_cache):
+            bloom_filter.prepare()
+    except DatabaseError:
+        logger.warning('Bloom filters will be built on first use', exc_info=True)
+    finally:
+        # Forked workers must not share the master's connections.
+        connections.close_all()
+
+    elapsed = time.perf_counter() - started
+    logger.info('Bloom filters took %.1f ms', elapsed * 1000)
+    return elapsed
+
+
+def prepare_server():
+    """Warm up and prestart the password pool, as enabled in the settings"""
+    if app_settings.WARMUP_ON_STARTUP:
+        warm_up()
+        build_filters()
+    prestart_process_pool()
@@ -0,0 +1,174 @@
+import atexit
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+
+from django.db import connection
+from django.db.models import Case, DateTimeField, Value, When
+
+from authentication.conf import app_settings
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer(ABC):
+    """
+    Collects keyed values in memory and writes them in bulk from a
+    background thread, every WRITE_BEHIND_INTERVAL seconds or as soon as
+    WRITE_BEHIND_MAX_PENDING entries are waiting. A later value for the
+    same key replaces the pending one. A batch that fails is retried entry
+    by entry, an entry still failing after WRITE_BEHIND_MAX_ATTEMPTS flushes
+    is logged and dropped.
+
+    When the buffer is disabled add() writes immediately; the test runner
+    disables both buffers so tests see their writes. Pending entries are
+    flushed at interpreter exit.
+    """
+    setting = None
+
+    def __init__(self):
+        self._pending = {}
+        self._attempts = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = None
+        atexit.register(self.flush)
+
+    @property
+    def enabled(self):
+        return getattr(app_settings, self.setting)
+
+    @abstractmethod
+    def write(self, batch):
+        """Write a {key: value} batch to the database"""
+
+    def add(self, key, value):
+        if not self.enabled:
+            self.write({key: value})
+            return
+
+        self._ensure_thread()
+        with self._lock:
+            self._pending[key] = value
+            full = len(self._pending) >= app_settings.WRITE_BEHIND_MAX_PENDING
+        if full:
+            self._wake.set()
+
+    def pop(self, key):
+        """Remove and return a pending value, or None"""
+        with self._lock:
+            return self._pending.pop(key, None)
+
+    def flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return
+        try:
+            self.write(batch)
+        except Exception:
+            logger.warning('%s failed to write %d entries, writing them one by one',
+                           type(self).__name__, len(batch), exc_info=True)
+        else:
+            self._attempts.clear()
+            return
+
+        # One bad entry must not hold back the rest: write each alone and
+        # requeue the failures, up to WRITE_BEHIND_MAX_ATTEMPTS flushes.
+        failed = {}
+        for key, value in batch.items():
+            try:
+                self.write({key: value})
+            except Exception:
+                attempts = self._attempts.get(key, 0) + 1
+                if attempts >= app_settings.WRITE_BEHIND_MAX_ATTEMPTS:
+                    logger.exception('%s dropped %r=%r after %d attempts',
+                                     type(self).__name__, key, value, attempts)
+                    self._attempts.pop(key, None)
+                else:
+                    self._attempts[key] = attempts
+                    failed[key] = value
+            else:
+                self._attempts.pop(key, None)
+        if failed:
+            with self._lock:
+                # Keep newer values that arrived while writing.
+                self._pending = {**failed, **self._pending}
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            # A forked child inherits the buffer but not the thread.
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name=type(self).__name__, daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(app_settings.WRITE_BEHIND_INTERVAL)
+            self._wake.clear()
+            self.flush()
+            connection.close()
+
+
+class LastLoginBuffer(WriteBehindBuffer):
+    """
+    Batches last_login updates into one UPDATE per flush.
+    """
+    setting = 'LAST_LOGIN_WRITE_BEHIND'
+    chunk_size = 500
+
+    def write(self, batch):
+        from authentication.models import UserModel
+
+        items = list(batch.items())
+        for start in range(0, len(items), self.chunk_size):
+            chunk = items[start:start + self.chunk_size]
+            UserModel.objects.filter(pk__in=[pk for pk, _ in chunk]).update(
+                last_login=Case(
+                    *[When(pk=pk, then=Value(last_login)) for pk, last_login in chunk],
+                    output_field=DateTimeField(),
+                )
+            )
+
+
+class OutstandingTokenBuffer(WriteBehindBuffer):
+    """
+    Batches the OutstandingToken rows of issued refresh tokens, keyed by
+    jti. Rows that already exist, e.g. created by blacklist() in another
+    process, are skipped, and so are the tokens of users deleted before
+    the flush.
+    """
+    setting = 'OUTSTANDING_TOKEN_WRITE_BEHIND'
+    chunk_size = 500
+
+    def write(self, batch):
+        from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+        from authentication.models import UserModel
+        from authentication.routers import ReplicaRouter
+
+        # ignore_conflicts covers unique conflicts only, a missing user
+        # would fail the whole insert. Checked on the primary, a replica
+        # may not have the users yet.
+        user_ids = set(
+            UserModel.objects.using(ReplicaRouter.primary)
+            .filter(pk__in={fields['user'].pk for fields in batch.values()})
+            .values_list('pk', flat=True)
+        )
+        OutstandingToken.objects.bulk_create(
+            [OutstandingToken(**fields) for fields in batch.values() if fields['user'].pk in user_ids],
+            batch_size=self.chunk_size,
+            ignore_conflicts=True,
+        )
+
+
+last_login_buffer = LastLoginBuffer()
+outstanding_token_buffer = OutstandingTokenBuffer()
@@ -0,0 +1,141 @@
+"""
+OpenAPI schema for the project, generated once per language and format.
+
+The schema is read from SCHEMA_DIR when `manage.py generate_schema` wrote
+it at build time, otherwise it is generated on first request. Either way
+it is kept in memory with its gzip encoding and a strong ETag, so serving
+the docs never walks the views again.
+"""
+import functools
+import gzip
+import hashlib
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.template.loader import render_to_string
+from django.utils import translation
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from django.utils.module_loading import import_string
+from rest_framework import permissions
+
+from authentication.conf import app_settings
+
+# drf_yasg is imported on first use, so workers that never serve the docs
+# don't load it.
+CODECS = {
+    'json': ('drf_yasg.codecs.OpenAPICodecJson', 'application/json'),
+    'yaml': ('drf_yasg.codecs.OpenAPICodecYaml', 'application/yaml'),
+}
+
+
+@functools.lru_cache(maxsize=None)
+def api_info():
+    from drf_yasg import openapi
+
+    return openapi.Info(
+        title="isOpen API",
+        default_version='v1',
+        description="isOpen WEBSITE APIs",
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def schema_view():
+    from drf_yasg.views import get_schema_view
+
+    return get_schema_view(
+        api_info(),
+        public=True,
+        permission_classes=(permissions.AllowAny,),
+    )
+
+
+def swagger_ui(request):
+    """
+    The swagger-ui page, rendered without the schema: the page fetches it
+    from SPEC_URL, and ?format=openapi is answered from the cache too.
+    """
+    from drf_yasg.renderers import SwaggerUIRenderer
+
+    if request.GET.get('format') == 'openapi':
+        return cached_schema(request, 'json')
+    renderer = SwaggerUIRenderer()
+    context = {'request': request}
+    renderer.set_context(context)
+    info = api_info()
+    context.update(title=info.title, version=info._default_version)
+    return HttpResponse(
+        render_to_string(renderer.template, context, request),
+        content_type=f'{renderer.media_type}; charset={renderer.charset}',
+    )
+
+
+def schema_filename(language, fmt):
+    return f'schema-{language}.{fmt}'
+
+
+def generate_schema(language, fmt):
+    """Generate the encoded schema for a language prefix of i18n_patterns"""
+    codec_path, _ = CODECS[fmt]
+    codec_class = import_string(codec_path)
+    with translation.override(language):
+        generator = schema_view().generator_class(api_info())
+        schema = generator.get_schema(request=None, public=True)
+        return codec_class(validators=[]).encode(schema)
+
+
+class SchemaEntry:
+    def __init__(self, body, content_type):
+        self.body = body
+        self.gzipped = gzip.compress(body, mtime=0)
+        self.content_type = content_type
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.etag = f'"{digest}"'
+        self.gzip_etag = f'"{digest}-gzip"'
+
+
+_entries = {}
+_lock = threading.Lock()
+
+
+def get_schema_entry(language, fmt):
+    key = (language, fmt)
+    entry = _entries.get(key)
+    if entry is None:
+        with _lock:
+            entry = _entries.get(key)
+            if entry is None:
+                _, content_type = CODECS[fmt]
+                path = Path(app_settings.SCHEMA_DIR or '') / schema_filename(language, fmt)
+                if app_settings.SCHEMA_DIR and path.is_file():
+                    body = path.read_bytes()
+                else:
+                    body = generate_schema(language, fmt)
+                entry = _entries[key] = SchemaEntry(body, content_type)
+    return entry
+
+
+def clear_schema_cache():
+    with _lock:
+        _entries.clear()
+
+
+def cached_schema(request, fmt='json'):
+    language = translation.get_language() or settings.LANGUAGE_CODE
+    entry = get_schema_entry(language, fmt)
+
+    use_gzip = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+    etag = entry.gzip_etag if use_gzip else entry.etag
+    if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(entry.gzipped if use_gzip else entry.body, content_type=entry.content_type)
+        if use_gzip:
+            response['Content-Encoding'] = 'gzip'
+    response['ETag'] = etag
+    response['Cache-Control'] = f'public, max-age={app_settings.SCHEMA_MAX_AGE}'
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
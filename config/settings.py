@@ -48,13 +48,17 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'authentication.middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'authentication.middleware.ReplicaPinningMiddleware',
+    # The Profiled* classes are Django's middleware, skipped for the routes
+    # listed in AUTHENTICATION['MIDDLEWARE_PROFILES'].
+    'authentication.middleware.ProfiledSessionMiddleware',
     'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'authentication.middleware.ProfiledCsrfViewMiddleware',
+    'authentication.middleware.ProfiledAuthenticationMiddleware',
+    'authentication.middleware.ProfiledMessageMiddleware',
+    'authentication.middleware.ProfiledXFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -87,6 +91,41 @@ DATABASES = {
     }
 }
 
+# Read replicas, e.g. DATABASE_REPLICAS=replica1,replica2 adds one SQLite
+# file per alias for local testing (create their tables with
+# `manage.py migrate --database=replica1`).
+for alias in filter(None, os.environ.get('DATABASE_REPLICAS', '').split(',')):
+    DATABASES[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / f'{alias}.sqlite3',
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['authentication.routers.ReplicaRouter']
+
+# Cache
+# The throttle cache is per process; point it at Redis or Memcached to
+# share rate limits between workers. The refresh grace cache must be
+# shared, it lives in the database until a Redis or Memcached server is
+# available; create its table with `manage.py createcachetable`.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'throttle': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'throttle',
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
+    },
+    'refresh_grace': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'refresh_grace_cache',
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -155,6 +194,8 @@ SWAGGER_SETTINGS = {
         }
     },
     'USE_SESSION_AUTH': False,
+    # The UI loads the precomputed schema instead of generating it per request
+    'SPEC_URL': 'schema-json',
 }
 
 REST_FRAMEWORK = {
@@ -162,17 +203,30 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-        'rest_framework.authentication.SessionAuthentication',
+        'authentication.authentication.ClaimsJWTAuthentication',
     ],
+    # Login and register are limited per client IP and per phone number
+    # before any password hashing happens.
+    'DEFAULT_THROTTLE_RATES': {
+        'login_ip': '30/min',
+        'login_phone': '5/min',
+        'register_ip': '10/min',
+        'register_phone': '3/min',
+        'refresh_ip': '60/min',
+        'availability_ip': '300/min',
+    },
+    # Proxies in front of the app. Throttles and the /metrics allow list
+    # read the client address from X-Forwarded-For past this many hops.
+    'NUM_PROXIES': None,
 }
 
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
-    'ROTATE_REFRESH_TOKENS': False,
+    'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
-    'UPDATE_LAST_LOGIN': True,
+    # last_login is written through authentication.writebehind instead
+    'UPDATE_LAST_LOGIN': False,
 
     'ALGORITHM': 'HS256',
     'SIGNING_KEY': SECRET_KEY,
@@ -195,10 +249,125 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_LIFETIME': timedelta(minutes=5),
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
 }
+
+AUTHENTICATION = {
+    'BATCH_REGISTER_MAX_ROWS': 10000,
+    'BATCH_REGISTER_CHUNK_SIZE': 500,
+    # Threads used for parallel password hashing, None means one per core
+    'PASSWORD_HASHING_WORKERS': None,
+    # Login checks and create_user hashing run on a process pool so they
+    # scale with cores under threaded WSGI. A broken pool, or a job still
+    # queued after the timeout, falls back to hashing on the request
+    # thread; a job already running when it times out answers 503.
+    # The pool is started when the WSGI/ASGI application loads; with a
+    # preloading server (gunicorn --preload) turn PASSWORD_POOL_PRESTART
+    # off, since the master's pool is of no use to forked workers.
+    'PASSWORD_POOL_ENABLED': True,
+    'PASSWORD_POOL_WORKERS': None,
+    'PASSWORD_POOL_TIMEOUT': 5,
+    'PASSWORD_POOL_PRESTART': True,
+    # Blacklisted refresh tokens are answered from a per-process bloom filter
+    # and LRU; rows written by other workers are picked up within
+    # REVOCATION_SYNC_INTERVAL seconds.
+    'REVOCATION_CACHE_ENABLED': True,
+    'REVOCATION_BLOOM_CAPACITY': 1000000,
+    'REVOCATION_BLOOM_ERROR_RATE': 0.001,
+    'REVOCATION_LRU_SIZE': 10000,
+    'REVOCATION_SYNC_INTERVAL': 2,
+    # Every poll re-reads this many ids below the highest one seen, for
+    # blacklist rows whose transaction committed after a later row's.
+    'REVOCATION_RESCAN_WINDOW': 1000,
+    # The phone availability check keeps every registered number in a
+    # bloom filter, built at server startup, picking up other workers'
+    # signups every PHONE_REGISTRY_SYNC_INTERVAL seconds and re-reading
+    # the last PHONE_REGISTRY_RESCAN_WINDOW ids like the blacklist above.
+    'PHONE_BLOOM_CAPACITY': 1000000,
+    'PHONE_BLOOM_ERROR_RATE': 0.001,
+    'PHONE_REGISTRY_SYNC_INTERVAL': 2,
+    'PHONE_REGISTRY_RESCAN_WINDOW': 1000,
+    # Embed is_verified, country, is_staff and is_superuser in tokens and
+    # authenticate requests from those claims without loading the user row.
+    'CLAIMS_ONLY_USER': False,
+    # Access tokens that passed verification are remembered per process
+    # until they expire, so repeat requests skip the HMAC check.
+    'VERIFIED_TOKEN_CACHE_ENABLED': True,
+    'VERIFIED_TOKEN_CACHE_SIZE': 10000,
+    # Cache alias holding login/register rate limit history. The 'throttle'
+    # cache above is local memory, so each worker process counts on its
+    # own; use a shared cache to enforce the limits across workers.
+    'THROTTLE_CACHE': 'throttle',
+    # last_login and the outstanding rows of issued refresh tokens are
+    # buffered in memory and written in batches every WRITE_BEHIND_INTERVAL
+    # seconds or WRITE_BEHIND_MAX_PENDING entries. Disable to write
+    # synchronously; config.test_runner does so for the tests. An entry
+    # that fails WRITE_BEHIND_MAX_ATTEMPTS flushes in a row is dropped.
+    'LAST_LOGIN_WRITE_BEHIND': True,
+    'OUTSTANDING_TOKEN_WRITE_BEHIND': True,
+    'WRITE_BEHIND_INTERVAL': 5,
+    'WRITE_BEHIND_MAX_PENDING': 1000,
+    'WRITE_BEHIND_MAX_ATTEMPTS': 3,
+    # Reads of users and tokens go to these aliases; a client that wrote
+    # reads from the primary for REPLICA_LAG_TOLERANCE seconds.
+    'DATABASE_REPLICAS': [alias for alias in DATABASES if alias != 'default'],
+    'REPLICA_LAG_TOLERANCE': 5,
+    'REPLICA_PIN_COOKIE': 'primary_pin',
+    # Written by `manage.py generate_schema`; when missing, the schema is
+    # generated once per process on first request.
+    'SCHEMA_DIR': BASE_DIR / 'schema',
+    'SCHEMA_MAX_AGE': 3600,
+    # Per-request phase timings, aggregated into the histograms at
+    # /metrics. The Server-Timing header shows them to any client, so it
+    # is only sent in development. Only the listed client addresses may
+    # scrape /metrics, None allows everyone; behind a proxy set
+    # REST_FRAMEWORK['NUM_PROXIES'] so the address is read from
+    # X-Forwarded-For.
+    'METRICS_ENABLED': True,
+    'SERVER_TIMING_HEADER': DEBUG,
+    'METRICS_ALLOWED_IPS': ['127.0.0.1', '::1'],
+    # Build the password validators, URL resolver and serializers when a
+    # server loads config.wsgi or config.asgi, before a preloading server
+    # forks its workers. Management commands skip it.
+    'WARMUP_ON_STARTUP': True,
+    # Route prefixes, matched with or without the language prefix, and the
+    # middleware they skip. The JWT API is stateless and needs no session,
+    # CSRF, messages or frame options; the admin keeps the full stack.
+    'MIDDLEWARE_PROFILES': {
+        '/api/': [
+            'django.contrib.sessions.middleware.SessionMiddleware',
+            'django.middleware.csrf.CsrfViewMiddleware',
+            'django.contrib.auth.middleware.AuthenticationMiddleware',
+            'django.contrib.messages.middleware.MessageMiddleware',
+            'django.middleware.clickjacking.XFrameOptionsMiddleware',
+        ],
+    },
+    # The admin user list counts exactly up to this many rows and shows
+    # the planner's estimate above it.
+    'ADMIN_EXACT_COUNT_LIMIT': 10000,
+    # The user export reads this many rows per query.
+    'EXPORT_BATCH_SIZE': 2000,
+    # `manage.py prune_tokens` deletes expired tokens this many ids at a
+    # time, pausing between batches to leave room for live traffic.
+    'TOKEN_PRUNE_BATCH_SIZE': 5000,
+    'TOKEN_PRUNE_SLEEP': 0.1,
+    # A rotated refresh token can be presented again for this many seconds
+    # and gets the same new pair, so retried refreshes don't log users out.
+    # Must be a cache shared by all workers, the system checks refuse a
+    # per-process one.
+    'REFRESH_GRACE_CACHE': 'refresh_grace',
+    'REFRESH_GRACE_PERIOD': 30,
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'authentication.UserModel'
+AUTHENTICATION_BACKENDS = [
+    'authentication.backends.PooledModelBackend',
+]
 AUTH_USERNAME_FIELD = 'phone_number'
 ACCOUNT_EMAIL_REQUIRED = False
+
+# Writes synchronously and hashes inline under `manage.py test`, see
+# config/test_runner.py.
+TEST_RUNNER = 'config.test_runner.TestRunner'
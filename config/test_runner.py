@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.db import connections
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+# Background writers and worker processes would outlive the test database
+# or write after the assertions ran.
+TEST_AUTHENTICATION = {
+    'LAST_LOGIN_WRITE_BEHIND': False,
+    'OUTSTANDING_TOKEN_WRITE_BEHIND': False,
+    'PASSWORD_POOL_ENABLED': False,
+}
+
+# A second SQLite database for the ReplicaRouter tests. Nothing reads from
+# it unless a test lists it in DATABASE_REPLICAS.
+REPLICA_ALIAS = 'replica'
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Runs the tests with the write-behind buffers writing synchronously,
+    passwords hashed on the test thread and a REPLICA_ALIAS database.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        if REPLICA_ALIAS not in settings.DATABASES:
+            settings.DATABASES[REPLICA_ALIAS] = {'ENGINE': 'django.db.backends.sqlite3'}
+            connections.configure_settings(settings.DATABASES)
+        self._authentication_settings = override_settings(
+            AUTHENTICATION={**settings.AUTHENTICATION, **TEST_AUTHENTICATION}
+        )
+        self._authentication_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._authentication_settings.disable()
+        super().teardown_test_environment(**kwargs)
@@ -17,28 +17,21 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from django.conf.urls.i18n import i18n_patterns
-from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
 from django.conf import settings
 from django.conf.urls.static import static
 
-schema_view = get_schema_view(
-    openapi.Info(
-        title="isOpen API",
-        default_version='v1',
-        description="isOpen WEBSITE APIs",
-    ),
-    public=True,
-    permission_classes=(permissions.AllowAny,),
-)
+from authentication.metrics import metrics_view
+from config.schema import cached_schema, swagger_ui
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
 ]
 
 urlpatterns += i18n_patterns(
-    path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
+    path('swagger/', swagger_ui, name='schema-swagger-ui'),
+    path('swagger.json', cached_schema, {'fmt': 'json'}, name='schema-json'),
+    path('swagger.yaml', cached_schema, {'fmt': 'yaml'}, name='schema-yaml'),
     path('api/v1/auth/', include('authentication.urls')),
 )
 